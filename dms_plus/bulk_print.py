@@ -0,0 +1,214 @@
+"""
+Bulk PDF generation for the DMS print formats (month-end tax invoices etc.).
+
+`enqueue_bulk_pdf` checks print permission and queues `generate_bulk_pdf`
+on the long queue. The job:
+    1. primes the shared print context (companies, customer addresses) once
+       for the whole batch, see print_context.prime_print_context
+    2. renders the HTML of each document, with the print assets inlined as
+       data URIs: the job has no session cookie, so wkhtmltopdf could not
+       fetch /private/files URLs
+    3. converts the pages to PDF in a thread pool, wkhtmltopdf runs as its
+       own process so the conversions really run side by side. Submitted
+       documents printed before come from the render cache instead
+    4. merges everything into one PDF, or packs one PDF per document in a ZIP,
+       and attaches the result as a private File
+
+Progress is reported with `frappe.publish_progress`, and the file URL is
+sent to the user on the `dms_bulk_pdf` realtime event when done.
+"""
+
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+from dms_plus.crm_permissions.quotation_permissions import get_quotation_permissions
+from dms_plus.print_context import prime_print_context
+from dms_plus import render_cache
+
+OUTPUT_TYPES = ("pdf", "zip")
+# render cache producer of the HTML with inlined assets and the PDFs
+# converted from it with prepare_pdf's options
+PDF_PRODUCER = "bulk_print"
+PRINT_CONTEXT_FIELDS = {
+    "Sales Invoice": ["name", "company", "customer", "customer_name"],
+    "Quotation": ["name", "company", "quotation_to", "party_name", "customer_name"],
+}
+
+
+@frappe.whitelist()
+def enqueue_bulk_pdf(doctype, names, print_format=None, letterhead=None, output="pdf", lang=None):
+    names = frappe.parse_json(names)
+    if isinstance(names, str):
+        names = [names]
+
+    if output not in OUTPUT_TYPES:
+        frappe.throw(_("Unsupported output: {0}").format(output))
+    if not names:
+        frappe.throw(_("Select at least one document"))
+
+    check_print_permission(doctype, names)
+
+    job = frappe.enqueue(
+        generate_bulk_pdf,
+        queue="long",
+        timeout=3600,
+        doctype=doctype,
+        names=names,
+        print_format=print_format,
+        letterhead=letterhead,
+        output=output,
+        lang=lang,
+    )
+    return job.id if job else None
+
+
+def check_print_permission(doctype, names):
+    """Quotations are decided together (one team query for all owners), other doctypes one by one."""
+    if doctype != "Quotation":
+        for name in names:
+            frappe.has_permission(doctype, "print", doc=name, throw=True)
+        return
+
+    frappe.has_permission(doctype, "print", throw=True)
+    denied = [name for name, allowed in get_quotation_permissions(names, "print").items() if not allowed]
+    if denied:
+        frappe.throw(_("Not permitted to print {0}").format(", ".join(denied)), frappe.PermissionError)
+
+
+def generate_bulk_pdf(doctype, names, print_format=None, letterhead=None, output="pdf", lang=None):
+    if lang:
+        frappe.local.lang = lang
+
+    # see print_assets.get_print_asset
+    frappe.local.dms_inline_print_assets = True
+    try:
+        return build_bulk_pdf(doctype, names, print_format, letterhead, output, lang)
+    finally:
+        frappe.local.dms_inline_print_assets = False
+
+
+def build_bulk_pdf(doctype, names, print_format, letterhead, output, lang):
+
+    title = _("Bulk PDF: {0}").format(_(doctype))
+    total = len(names)
+
+    # 1. shared context, once for the batch
+    fields = PRINT_CONTEXT_FIELDS.get(doctype)
+    if fields:
+        prime_print_context(frappe.get_all(doctype, filters={"name": ["in", names]}, fields=fields))
+
+    # 2. HTML, needs the site connection so it stays on this thread.
+    # submitted documents already printed once come straight from the render cache
+    pages, pdfs, errors = [], {}, {}
+    no_letterhead = 0 if letterhead else 1
+    for i, name in enumerate(names, 1):
+        try:
+            doc = frappe.get_doc(doctype, name)
+            key = render_cache.get_cache_key(doc, print_format, letterhead, no_letterhead, lang, PDF_PRODUCER)
+            cached = render_cache.get(key, "pdf")
+            if cached is not None:
+                pdfs[name] = cached
+            else:
+                html = render_cache.get_html(doc, print_format, letterhead, no_letterhead, lang, PDF_PRODUCER)
+                pages.append((name, key, *prepare_pdf(html)))
+        except Exception:
+            errors[name] = frappe.get_traceback()
+
+        frappe.publish_progress(i * 50 / total, title=title, description=_("Rendering {0}").format(name))
+
+    # 3. PDF, one wkhtmltopdf process per worker thread
+    with ThreadPoolExecutor(max_workers=get_pdf_workers()) as pool:
+        futures = {name: (key, pool.submit(to_pdf, html, options)) for name, key, html, options in pages}
+        for i, (name, (key, future)) in enumerate(futures.items(), 1):
+            try:
+                pdfs[name] = future.result()
+                render_cache.put(key, "pdf", pdfs[name])
+            except Exception:
+                errors[name] = frappe.get_traceback()
+
+            frappe.publish_progress(50 + i * 45 / total, title=title, description=_("Converting {0}").format(name))
+
+    for name, error in errors.items():
+        frappe.log_error(title=f"Bulk PDF: {doctype} {name}", message=error)
+
+    # 4. one PDF or a ZIP, in the order requested
+    pdfs = [(name, pdfs[name]) for name in names if name in pdfs]
+    file_url = None
+    if pdfs:
+        content = merge_pdfs(pdfs) if output == "pdf" else zip_pdfs(pdfs)
+        file_url = save_output(doctype, content, output)
+
+    frappe.publish_progress(100, title=title, description=_("Done"))
+    frappe.publish_realtime(
+        "dms_bulk_pdf",
+        {"file_url": file_url, "count": len(pdfs), "failed": list(errors)},
+        user=frappe.session.user,
+    )
+    return file_url
+
+
+def get_pdf_workers():
+    return cint(frappe.conf.get("dms_plus_pdf_workers")) or min(8, os.cpu_count() or 1)
+
+
+def prepare_pdf(html):
+    """
+    The part of `frappe.utils.pdf.get_pdf` before wkhtmltopdf runs (urls,
+    header / footer files, cookies). It needs frappe.local, so it runs here.
+    """
+    from frappe.utils.pdf import prepare_options, scrub_urls
+
+    html, options = prepare_options(scrub_urls(html), {})
+    options.update({"disable-javascript": "", "disable-local-file-access": "", "disable-smart-shrinking": ""})
+    return html, options
+
+
+def to_pdf(html, options):
+    import pdfkit
+    from frappe.utils.pdf import cleanup
+
+    try:
+        return pdfkit.from_string(html, False, options=options)
+    finally:
+        cleanup(options)
+
+
+def merge_pdfs(pdfs):
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        from PyPDF2 import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for name, content in pdfs:
+        for page in PdfReader(io.BytesIO(content)).pages:
+            writer.add_page(page)
+
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def zip_pdfs(pdfs):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in pdfs:
+            archive.writestr(f"{frappe.scrub(name)}.pdf", content)
+    return out.getvalue()
+
+
+def save_output(doctype, content, output):
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": f"{frappe.scrub(doctype)}_{now_datetime():%Y%m%d_%H%M%S}.{output}",
+        "content": content,
+        "is_private": 1,
+    })
+    file_doc.insert(ignore_permissions=True)
+    frappe.db.commit()
+    return file_doc.file_url
@@ -0,0 +1,58 @@
+import functools
+
+import frappe
+from dms_plus.crm_permissions.context import clear_user_context_cache
+from dms_plus.memo import clear_memo, get_memoised
+
+# (user, doctype) -> condition, shared by all workers through redis
+CONDITIONS_CACHE_KEY = "dms_plus:permission_query_conditions"
+CONDITIONS_LOCAL_ATTR = "dms_permission_conditions"
+
+
+def cached_query_conditions(doctype):
+    """
+    Cache the result of a `get_permission_query_conditions(user)` builder.
+
+    A list page calls the hook several times (list, count, group-by sidebar),
+    so the condition is kept in `frappe.local` for the rest of the request and
+    in redis across requests, until one of the invalidation hooks fires.
+
+    Only the sales person / employee names are baked into the conditions,
+    Sales Team rows are matched by `exists (...)` when the query runs, so
+    editing them does not need to clear anything.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(user=None, **kwargs):
+            if not user:
+                user = frappe.session.user
+
+            return get_memoised(
+                CONDITIONS_CACHE_KEY, CONDITIONS_LOCAL_ATTR, f"{user}::{doctype}", lambda: fn(user)
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def clear_permission_cache(*args, **kwargs):
+    """Drop every cached condition and user context. Also used as the `clear_cache` hook."""
+    clear_memo(CONDITIONS_CACHE_KEY, CONDITIONS_LOCAL_ATTR)
+    clear_user_context_cache()
+
+
+# ========== doc_events ==========
+def on_user_change(doc, method=None):
+    """Roles live in the Has Role child table, they are saved with the User."""
+    clear_permission_cache()
+
+
+def on_employee_change(doc, method=None):
+    if method == "on_trash" or doc.has_value_changed("reports_to") or doc.has_value_changed("user_id"):
+        clear_permission_cache()
+
+
+def on_sales_person_change(doc, method=None):
+    if method == "on_trash" or doc.has_value_changed("employee"):
+        clear_permission_cache()
@@ -0,0 +1,103 @@
+import frappe
+from dms_plus.crm_permissions.policy import get_policy, has_class
+
+# user -> (employee, sales_person), one redis hash shared by all workers,
+# dropped as a whole by clear_user_context_cache
+USER_CONTEXT_CACHE_KEY = "dms_plus:user_sales_context"
+
+_NOT_LOADED = object()
+
+
+class UserSalesContext:
+    """
+    Roles, Employee and Sales Person of one user, loaded on first access.
+
+    Permission hooks ask for the same three things on every call, one
+    context is kept per user for the whole request (see `get_user_context`)
+    and the Employee / Sales Person names are also kept in redis until a
+    User, Employee or Sales Person changes. Only names are loaded, never
+    the full docs.
+    """
+
+    __slots__ = ("user", "_roles", "_mask", "_employee", "_sales_person")
+
+    def __init__(self, user):
+        self.user = user
+        self._roles = _NOT_LOADED
+        self._mask = _NOT_LOADED
+        self._employee = _NOT_LOADED
+        self._sales_person = _NOT_LOADED
+
+    @property
+    def roles(self):
+        # frappe already caches roles in redis and clears them on role changes
+        if self._roles is _NOT_LOADED:
+            self._roles = frozenset(frappe.get_roles(self.user))
+        return self._roles
+
+    @property
+    def mask(self):
+        """The user's roles folded into a role-class bitmask, see policy.py"""
+        if self._mask is _NOT_LOADED:
+            self._mask = get_policy().get_mask(self.roles)
+        return self._mask
+
+    @property
+    def employee(self):
+        if self._employee is _NOT_LOADED:
+            self._load_employee()
+        return self._employee
+
+    @property
+    def sales_person(self):
+        if self._sales_person is _NOT_LOADED:
+            self._load_employee()
+        return self._sales_person
+
+    def has_role(self, role):
+        return role in self.roles
+
+    def has_any_role(self, roles):
+        return not self.roles.isdisjoint(roles)
+
+    def has_class(self, name):
+        return has_class(self.mask, name)
+
+    def decide(self, rule):
+        return get_policy().decide(rule, self.mask)
+
+    def _load_employee(self):
+        cached = frappe.cache.hget(USER_CONTEXT_CACHE_KEY, self.user)
+
+        if cached is None:
+            row = frappe.db.sql("""
+                SELECT e.name AS employee, sp.name AS sales_person
+                FROM `tabEmployee` e
+                LEFT JOIN `tabSales Person` sp ON sp.employee = e.name
+                WHERE e.user_id = %s
+                ORDER BY sp.creation
+                LIMIT 1
+            """, self.user, as_dict=True)
+            cached = (row[0].employee, row[0].sales_person) if row else (None, None)
+            frappe.cache.hset(USER_CONTEXT_CACHE_KEY, self.user, cached)
+
+        self._employee, self._sales_person = cached
+
+
+def get_user_context(user=None):
+    user = user or frappe.session.user
+
+    if not hasattr(frappe.local, "dms_user_contexts"):
+        frappe.local.dms_user_contexts = {}
+
+    context = frappe.local.dms_user_contexts.get(user)
+    if context is None:
+        context = frappe.local.dms_user_contexts[user] = UserSalesContext(user)
+
+    return context
+
+
+def clear_user_context_cache():
+    # a single key, no KEYS scan on the User / Employee / Sales Person save path
+    frappe.cache.delete_value(USER_CONTEXT_CACHE_KEY)
+    frappe.local.dms_user_contexts = {}
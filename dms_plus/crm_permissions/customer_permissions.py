@@ -1,50 +1,32 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from dms_plus.crm_permissions.utils import get_team_hierarchy
-
+from dms_plus.crm_permissions.utils import get_team_hierarchy, get_sales_persons_for_users
+from dms_plus.crm_permissions.cache import cached_query_conditions
+from dms_plus.crm_permissions.context import get_user_context
+from dms_plus.crm_permissions.item_permissions import get_blocked_item_groups, get_item_groups
+from dms_plus.crm_permissions.network_users import get_non_network_owner_condition
+from dms_plus.crm_permissions.policy import JUNIOR_ITEM_ROLES
+from dms_plus.crm_permissions.tracing import traced
+
+@traced("Customer.get_permission_query_conditions")
+@cached_query_conditions("Customer")
 def get_permission_query_conditions(user=None):
 
-    NETWORK_ROLES = {
-        "Sales Master Manager - Network",
-        "Sales Manager - Network",
-        "Product MGR - Network",
-        "Sales Coordinator - Network DEPT",
-        "Senior Sales - Network DEPT",
-        "Junior Sales - Network DEPT",
-    }
-
     if not user:
         user = frappe.session.user
 
-    roles = frappe.get_roles(user)
-
-    if user != "Administrator" and "CEO" not in roles:
+    # see policy.customer_scope
+    scope = "all" if user == "Administrator" else get_user_context(user).decide("customer_scope")
 
-        is_network_user = any(role in NETWORK_ROLES for role in roles)
+    if scope == "non_network":
+        return get_non_network_owner_condition("Customer")
 
-        if not is_network_user:
-            return """
-                `tabCustomer`.owner NOT IN (
-                    select hr.parent
-                    from `tabHas Role` hr
-                    where hr.role in ({roles})
-                    and hr.parenttype = "User"
-                )
-            """.format(
-                roles=", ".join(frappe.db.escape(r) for r in NETWORK_ROLES)
-            )
-
-    if (
-        user == "Administrator"
-        or "CEO" in roles
-    ):
+    if scope == "all":
         return "1=1"
 
     # View All Customers - Network DEPT
-    if ("Sales Coordinator - Network DEPT" in roles
-        or "Sales Manager - Network" in roles
-        or "Sales Master Manager - Network" in roles):
+    if scope == "team":
 
         team_members = get_team_hierarchy(user)
         if not team_members:
@@ -53,20 +35,11 @@ def get_permission_query_conditions(user=None):
             frappe.db.escape(member) for member in team_members
             )
 
-        sales_persons = []
-        employees = frappe.get_all(
-            "Employee",
-            filters={"user_id": ["in", team_members]},
-            fields=["name"]
-        )
-        for emp in employees:
-            sp = frappe.get_all(
-                "Sales Person",
-                filters={"employee": emp.name},
-                fields=["name"]
-            )
-            for s in sp:
-                sales_persons.append(s.name)
+        sales_persons = [
+            sp
+            for user_sales_persons in get_sales_persons_for_users(team_members).values()
+            for sp in user_sales_persons
+        ]
 
         sales_persons_sql = ", ".join(frappe.db.escape(sp) for sp in sales_persons)
 
@@ -85,85 +58,42 @@ def get_permission_query_conditions(user=None):
         condition += ")"
         return condition
     # Junior/Senior Sales - Network DEPT
-    is_junior = "Junior Sales - Network DEPT" in roles
-    is_senior = "Senior Sales - Network DEPT" in roles
-
-    if is_junior:
-        return get_junior_sales_customer(user)
+    if scope == "own_sales_person":
+        return get_own_sales_customer(user)
 
-    if is_senior:
-        return get_senior_sales_customer(user)
-
-def get_junior_sales_customer(user):
-    try:
-        employee = frappe.get_doc("Employee", {"user_id": user})
-        junior_sales_person = frappe.get_doc(
-                "Sales Person",
-                {"employee": employee.name}
-            )
-        query = f"""
-              (
-                exists (
-                    select 1
-                    from `tabSales Team` st
-                    where st.parenttype = 'Customer'
-                    and st.parent = `tabCustomer`.name
-                    and st.sales_person = {frappe.db.escape(junior_sales_person.name)}
-                )
-                OR `tabCustomer`.owner = {frappe.db.escape(user)}
-            )
-        """
-        return query
-
-    except:
+def get_own_sales_customer(user):
+    """Customers where the user's Sales Person is in the Sales Team, or owned by the user."""
+    sales_person = get_user_context(user).sales_person
+    if not sales_person:
         frappe.throw(
             _("Sales Person record not found for employee {0}").format(user),
             frappe.PermissionError
         )
-        return "1=0"
-
-def get_senior_sales_customer(user):
-    try:
-        employee = frappe.get_doc("Employee", {"user_id": user})
-        senior_sales_person = frappe.get_doc(
-                "Sales Person",
-                {"employee": employee.name}
-            )
-        query = f"""
-              (
-                exists (
-                    select 1
-                    from `tabSales Team` st
-                    where st.parenttype = 'Customer'
-                    and st.parent = `tabCustomer`.name
-                    and st.sales_person = {frappe.db.escape(senior_sales_person.name)}
-                )
-                OR `tabCustomer`.owner = {frappe.db.escape(user)}
-            )
-        """
-        return query
 
-    except:
-        frappe.throw(
-            _("Sales Person record not found for employee {0}").format(user),
-            frappe.PermissionError
+    query = f"""
+          (
+            exists (
+                select 1
+                from `tabSales Team` st
+                where st.parenttype = 'Customer'
+                and st.parent = `tabCustomer`.name
+                and st.sales_person = {frappe.db.escape(sales_person)}
+            )
+            OR `tabCustomer`.owner = {frappe.db.escape(user)}
         )
-        return "1=0"
+    """
+    return query
 
 def customer_sales_permission(doc, ptype, user):
     if not user:
         user = frappe.session.user
-    roles = frappe.get_roles(user)
+    access = get_user_context(user).decide("customer_access")
 
-    if user == "Administrator" or any(
-        role in roles
-        for role in ["CEO", "Sales Manager - Network", "Sales Master Manager - Network"]
-    ):
+    if user == "Administrator" or access == "full":
         return True
 
     # Junior/Senior Sales in Network DEPT
-    if ("Junior Sales - Network DEPT" in roles) or \
-   ("Senior Sales - Network DEPT" in roles):
+    if access == "sales_team":
         if doc.is_new():
             return True
         else:
@@ -175,11 +105,10 @@ def customer_sales_permission(doc, ptype, user):
                     #  can not edit
                     return False
 
-            employee = frappe.get_doc("Employee", {"user_id": user})
-            sales_person = frappe.get_doc("Sales Person", {"employee": employee.name})
-            allowed = frappe.db.exists(
+            sales_person = get_user_context(user).sales_person
+            allowed = sales_person and frappe.db.exists(
                 "Sales Team",
-                {"parenttype": "Customer", "parent": doc.name, "sales_person": sales_person.name}
+                {"parenttype": "Customer", "parent": doc.name, "sales_person": sales_person}
             )
             if allowed:
                 if ptype == "read":
@@ -194,20 +123,13 @@ def check_item_permission(item_code):
     if not item_code:
         return {"allowed": True}
 
-    roles = frappe.get_roles(user)
-    juniors = {
-        "Junior Sales - ALVOIP",
-        "Junior Sales - DMS",
-        "Junior Sales - AVTECH",
-    }
-
-    matched_roles = set(roles) & juniors
-    if not matched_roles:
+    context = get_user_context(user)
+    if not context.has_class("junior_item"):
         return {"allowed": True}
+    matched_roles = context.roles & JUNIOR_ITEM_ROLES
 
     # تجنب الـ exception بـ logical condition
-    item_group = frappe.db.get_value("Item", item_code, "item_group")
-    if item_group != "Professional Service":
+    if check_item_permissions([item_code])[item_code]:
         return {"allowed": True}
 
     # هنا بس نـthrow لأننا متأكدين إنه ممنوع
@@ -218,3 +140,26 @@ def check_item_permission(item_code):
         frappe.ValidationError
     )
 
+@frappe.whitelist()
+def check_item_permissions(item_codes):
+    """
+    Batch version of `check_item_permission` for the item table of a form.
+
+    Args:
+        item_codes: list (or JSON list) of item codes.
+
+    Returns:
+        dict: {item_code: True if allowed, False if denied}
+    """
+    item_codes = frappe.parse_json(item_codes) or []
+
+    if not get_user_context().has_class("junior_item"):
+        return {item_code: True for item_code in item_codes}
+
+    item_groups = get_item_groups(item_codes)
+    blocked_groups = get_blocked_item_groups()
+
+    return {
+        item_code: item_groups.get(item_code) not in blocked_groups
+        for item_code in item_codes
+    }
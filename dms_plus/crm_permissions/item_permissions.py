@@ -0,0 +1,90 @@
+import pickle
+
+import frappe
+
+BLOCKED_ITEM_GROUPS = ("Professional Service",)
+
+# blocked groups and every Item Group under them
+BLOCKED_GROUPS_CACHE_KEY = "dms_plus:blocked_item_groups"
+
+# item_code -> item_group
+ITEM_GROUPS_CACHE_KEY = "dms_plus:item_groups"
+
+
+def get_blocked_item_groups():
+    """Cached set of blocked Item Groups, including their descendants (lft/rgt)."""
+    return frappe.cache.get_value(BLOCKED_GROUPS_CACHE_KEY, generator=build_blocked_item_groups)
+
+
+def build_blocked_item_groups():
+    return set(frappe.db.sql_list("""
+        SELECT child.name
+        FROM `tabItem Group` parent
+        JOIN `tabItem Group` child
+            ON child.lft >= parent.lft AND child.rgt <= parent.rgt
+        WHERE parent.name IN %(groups)s
+    """, {"groups": BLOCKED_ITEM_GROUPS})) | set(BLOCKED_ITEM_GROUPS)
+
+
+def get_item_groups(item_codes):
+    """
+    {item_code: item_group} for all codes.
+
+    One HMGET on the redis item -> item_group index, the misses are resolved
+    from `tabItem` in one IN query and written back in one HSET. Values are
+    pickled, the same as `frappe.cache.hset` stores them.
+    """
+    item_codes = sorted(set(code for code in item_codes if code))
+    if not item_codes:
+        return {}
+
+    key = frappe.cache.make_key(ITEM_GROUPS_CACHE_KEY)
+    item_groups = {
+        item_code: pickle.loads(value)
+        for item_code, value in zip(item_codes, frappe.cache.hmget(key, item_codes))
+        if value is not None
+    }
+
+    missing = [item_code for item_code in item_codes if item_code not in item_groups]
+    if missing:
+        found = dict(frappe.get_all(
+            "Item",
+            filters={"name": ["in", missing]},
+            fields=["name", "item_group"],
+            as_list=True
+        ))
+        if found:
+            # RedisWrapper.hset takes one field, the plain client takes a mapping
+            pipe = frappe.cache.pipeline()
+            pipe.hset(key, mapping={code: pickle.dumps(group) for code, group in found.items()})
+            pipe.execute()
+        item_groups.update(found)
+
+    return item_groups
+
+
+def get_blocked_rows(items):
+    """
+    Rows whose item belongs to a blocked group, checked in one pass.
+
+    The item_group stored on the row can be stale or edited on the client,
+    so the group is always taken from the Item itself.
+    """
+    item_groups = get_item_groups(row.item_code for row in items)
+    blocked_groups = get_blocked_item_groups()
+
+    return [
+        (row, item_groups.get(row.item_code))
+        for row in items
+        if item_groups.get(row.item_code) in blocked_groups
+    ]
+
+
+def clear_blocked_item_groups(doc=None, method=None):
+    """Item Group on_update / on_trash: the tree or its lft/rgt may have moved."""
+    frappe.cache.delete_value(BLOCKED_GROUPS_CACHE_KEY)
+
+
+def clear_item_group_index(doc, method=None, old_name=None, *args):
+    """Item on_update / on_trash / after_rename (which passes the old name)."""
+    frappe.cache.hdel(ITEM_GROUPS_CACHE_KEY, old_name or doc.name)
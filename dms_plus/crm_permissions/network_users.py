@@ -0,0 +1,50 @@
+import frappe
+from dms_plus.crm_permissions.policy import NETWORK_ROLES
+
+# Check field on User, see install/fileds.py
+NETWORK_USER_FIELD = "dms_network_user"
+
+
+def get_non_network_owner_condition(doctype):
+    """
+    Hide documents owned by Network users from everyone outside Network.
+
+    `tabUser`.dms_network_user is kept in sync with the user's roles, so the
+    check is a primary key lookup per row that MariaDB runs as an anti-join,
+    instead of a `NOT IN (select ... from tabHas Role)` over every role row.
+    """
+    return f"""
+        NOT EXISTS (
+            select 1
+            from `tabUser` nu
+            where nu.name = `tab{doctype}`.owner
+            and nu.{NETWORK_USER_FIELD} = 1
+        )
+    """
+
+
+def set_network_user_flag(doc, method=None):
+    """User validate: roles are saved with the User in the Has Role child table."""
+    if not doc.meta.has_field(NETWORK_USER_FIELD):
+        return
+
+    roles = {d.role for d in doc.get("roles")}
+    doc.set(NETWORK_USER_FIELD, 1 if roles & NETWORK_ROLES else 0)
+
+
+def sync_network_users():
+    """Backfill the flag for every user in one statement."""
+    frappe.db.sql(
+        f"""
+        UPDATE `tabUser` u
+        SET u.{NETWORK_USER_FIELD} = EXISTS (
+            select 1
+            from `tabHas Role` hr
+            where hr.parent = u.name
+            and hr.parenttype = 'User'
+            and hr.role in %(roles)s
+        )
+        """,
+        {"roles": tuple(NETWORK_ROLES)},
+    )
+    frappe.db.commit()
@@ -0,0 +1,196 @@
+"""
+Role -> scope policy for every dms_plus permission check.
+
+The role sets used to be copied into each module and re-checked with
+`any(role in roles ...)` on every call. They are declared once here, in
+ROLE_CLASSES, and each decision (RULES) is written against role classes
+instead of role names.
+
+`get_policy()` compiles them once per worker and site:
+    - every enabled Role gets a bitmask of the classes it belongs to
+    - every rule gets a table {class bitmask: decision}, filled the first
+      time a bitmask is seen
+
+A user's roles fold into one bitmask (kept on UserSalesContext for the
+request), after which every decision is a single dict hit. Role changes
+bump the site's version in redis, and each worker recompiles on its next
+request.
+"""
+
+from types import MappingProxyType
+
+import frappe
+
+NETWORK_ROLES = frozenset({
+    "Sales Master Manager - Network",
+    "Sales Manager - Network",
+    "Product MGR - Network",
+    "Sales Coordinator - Network DEPT",
+    "Senior Sales - Network DEPT",
+    "Junior Sales - Network DEPT",
+})
+
+RESTRICTED_ROLES = frozenset({
+    "Junior Sales - ALVOIP",
+    "Junior Sales - DMS",
+    "Junior Sales - AVTECH",
+    "Senior Sales - ALVOIP",
+    "Senior Sales - DMS",
+    "Senior Sales - AVTECH",
+})
+
+JUNIOR_ITEM_ROLES = frozenset({
+    "Junior Sales - ALVOIP",
+    "Junior Sales - DMS",
+    "Junior Sales - AVTECH",
+})
+
+JUNIOR_ROLES = frozenset({"Junior Sales"})
+SENIOR_ROLES = frozenset({"Senior Sales"})
+TOP_ROLES = frozenset({"Sales Master Manager", "Sales Manager", "Product Manager", "CEO"})
+
+ROLE_CLASSES = {
+    "administrator": frozenset({"Administrator"}),
+    "ceo": frozenset({"CEO"}),
+    "network": NETWORK_ROLES,
+    # see all team quotations / sales orders
+    "network_manager": frozenset({"Sales Manager - Network", "Product MGR - Network", "Sales Master Manager - Network"}),
+    # see all team customers
+    "network_customer_team": frozenset({"Sales Coordinator - Network DEPT", "Sales Manager - Network", "Sales Master Manager - Network"}),
+    # open any customer
+    "network_customer_editor": frozenset({"Sales Manager - Network", "Sales Master Manager - Network"}),
+    "network_coordinator": frozenset({"Sales Coordinator - Network DEPT"}),
+    "network_senior": frozenset({"Senior Sales - Network DEPT"}),
+    "network_junior": frozenset({"Junior Sales - Network DEPT"}),
+    "restricted": RESTRICTED_ROLES,
+    "junior_item": JUNIOR_ITEM_ROLES,
+    "junior": JUNIOR_ROLES,
+}
+
+CLASS_BITS = {name: 1 << i for i, name in enumerate(ROLE_CLASSES)}
+
+POLICY_VERSION_KEY = "dms_plus:policy_version"
+
+
+# ========== Rules: set of role classes -> decision ==========
+def customer_scope(classes):
+    if not classes & {"ceo", "network"}:
+        return "non_network"
+    if "ceo" in classes:
+        return "all"
+    if "network_customer_team" in classes:
+        return "team"
+    if classes & {"network_junior", "network_senior"}:
+        return "own_sales_person"
+    return None
+
+
+def order_scope(classes):
+    """Quotation and Sales Order list scope"""
+    if not classes & {"ceo", "network"}:
+        return "non_network"
+    if classes & {"ceo", "administrator"}:
+        return "all"
+    if "network_manager" in classes:
+        return "team"
+    if classes & {"network_junior", "network_senior", "network_coordinator"}:
+        return "own"
+    return None
+
+
+def customer_access(classes):
+    if classes & {"ceo", "network_customer_editor"}:
+        return "full"
+    if classes & {"network_junior", "network_senior"}:
+        return "sales_team"
+    return None
+
+
+def quotation_access(classes):
+    """
+    Opening one quotation. "team" still falls through to the account manager
+    check for users who also hold a Senior / Junior role.
+    """
+    if "ceo" in classes:
+        return "full"
+    if classes & {"network_manager", "network_coordinator"}:
+        return "team"
+    return None
+
+
+RULES = {
+    "customer_scope": customer_scope,
+    "order_scope": order_scope,
+    "customer_access": customer_access,
+    "quotation_access": quotation_access,
+}
+
+
+# ========== Compiled policy ==========
+class CompiledPolicy:
+    __slots__ = ("version", "role_bits", "tables")
+
+    def __init__(self, version, role_bits, tables):
+        self.version = version
+        self.role_bits = role_bits
+        self.tables = tables
+
+    def get_mask(self, roles):
+        mask = 0
+        for role in roles:
+            mask |= self.role_bits.get(role, 0)
+        return mask
+
+    def decide(self, rule, mask):
+        table = self.tables[rule]
+        try:
+            return table[mask]
+        except KeyError:
+            classes = {name for name, bit in CLASS_BITS.items() if mask & bit}
+            table[mask] = decision = RULES[rule](classes)
+            return decision
+
+
+def compile_policy(version=None):
+    enabled_roles = set(frappe.get_all("Role", filters={"disabled": 0}, pluck="name"))
+
+    role_bits = {}
+    for name, roles in ROLE_CLASSES.items():
+        for role in roles & enabled_roles:
+            role_bits[role] = role_bits.get(role, 0) | CLASS_BITS[name]
+
+    # only the masks users actually have are ever decided
+    return CompiledPolicy(version, MappingProxyType(role_bits), {rule: {} for rule in RULES})
+
+
+# site -> CompiledPolicy, per worker
+_policies = {}
+
+
+def get_policy():
+    """The worker's compiled policy for this site, checked against the redis version once per request."""
+    policy = getattr(frappe.local, "dms_policy", None)
+    if policy:
+        return policy
+
+    version = frappe.cache.get_value(POLICY_VERSION_KEY)
+    policy = _policies.get(frappe.local.site)
+    if policy is None or policy.version != version:
+        policy = _policies[frappe.local.site] = compile_policy(version)
+
+    frappe.local.dms_policy = policy
+    return policy
+
+
+def has_class(mask, name):
+    return bool(mask & CLASS_BITS[name])
+
+
+def on_role_change(doc=None, method=None):
+    """Role on_update / on_trash: every worker recompiles on its next request."""
+    from dms_plus.crm_permissions.cache import clear_permission_cache
+
+    frappe.cache.set_value(POLICY_VERSION_KEY, frappe.generate_hash(length=10))
+    frappe.local.dms_policy = None
+    # conditions built under the old role set
+    clear_permission_cache()
@@ -1,7 +1,13 @@
 import frappe
 from frappe import _
-from dms_plus.crm_permissions.utils import get_team_hierarchy, get_network_user_query
-
+from dms_plus.crm_permissions.utils import get_team_hierarchy, get_team_hierarchies, get_network_user_query
+from dms_plus.crm_permissions.cache import cached_query_conditions
+from dms_plus.crm_permissions.context import get_user_context
+from dms_plus.crm_permissions.network_users import get_non_network_owner_condition
+from dms_plus.crm_permissions.tracing import traced
+
+@traced("Quotation.get_permission_query_conditions")
+@cached_query_conditions("Quotation")
 def get_permission_query_conditions(user=None):
     """
         Quotation View Permission Check
@@ -22,66 +28,38 @@ def get_permission_query_conditions(user=None):
         if none of the above, return quotations if he is Creator
     """
 
-    NETWORK_ROLES = {
-        "Sales Master Manager - Network",
-        "Sales Manager - Network",
-        "Product MGR - Network",
-        "Sales Coordinator - Network DEPT",
-        "Senior Sales - Network DEPT",
-        "Junior Sales - Network DEPT",
-    }
-
     if not user:
         user = frappe.session.user
 
-    roles = frappe.get_roles(user)
-    print(f"User: {user} & Roles: {roles}")
+    # see policy.order_scope
+    scope = "all" if user == "Administrator" else get_user_context(user).decide("order_scope")
 
     # ===== DEFAULT (Owner only) =====
-    if user != "Administrator" and "CEO" not in roles:
-        is_network_user = any(role in NETWORK_ROLES for role in roles)
-
-        if not is_network_user:
-            return """
-                `tabQuotation`.owner NOT IN (
-                    select hr.parent
-                    from `tabHas Role` hr
-                    where hr.role in ({roles})
-                    and hr.parenttype = "User"
-                )
-            """.format(
-                roles=", ".join(frappe.db.escape(r) for r in NETWORK_ROLES)
-            )
+    if scope == "non_network":
+        return get_non_network_owner_condition("Quotation")
 
     # ===== ADMIN & CEO =====
-    top_roles = ["Administrator", "CEO"]
-    if any(role in roles for role in top_roles):
+    if scope == "all":
         return ""
 
     # ==== TOP Managers =====
-    manager_roles = {"Sales Manager - Network", "Product MGR - Network", "Sales Master Manager - Network"}
-    if manager_roles.intersection(roles):
+    if scope == "team":
 
         team_members = get_team_hierarchy(user)
-        print("team_members: ",team_members)
         if not team_members:
             return "1=0"
 
 
-        print("members count: ",len(team_members))
         members = " ,".join(
             frappe.db.escape(member) for member in team_members
             )
-        print("members: ",members)
         return f"`tabQuotation`.owner IN ({members})"
 
-    is_junior = "Junior Sales - Network DEPT" in roles
-    is_senior = "Senior Sales - Network DEPT" in roles
-    is_coordinator = "Sales Coordinator - Network DEPT" in roles
-
-    if is_junior or is_senior or is_coordinator:
+    # ===== JUNIOR / SENIOR / COORDINATOR =====
+    if scope == "own":
         return get_network_user_query(user, doctype="Quotation", include_account_manager=True)
 
+@traced("Quotation.has_permission")
 def has_permission(doc, ptype=None, user=None):
     """
     Prevent opening quotation directly via URL if user is not allowed
@@ -97,51 +75,39 @@ def has_permission(doc, ptype=None, user=None):
     if not user:
         user = frappe.session.user
 
-    roles = frappe.get_roles(user)
-    print("roles",roles)
+    context = get_user_context(user)
+
+    # see policy.quotation_access
+    access = context.decide("quotation_access")
 
     # ===== ADMIN & TOP LEVEL CEO Only=====
-    if user == "Administrator" or any(
-        role in roles
-        for role in ["CEO"]
-    ):
+    if user == "Administrator" or access == "full":
         return True
 
     # ===== OWNER =====
     if doc.owner == user:
         return True
 
-    print(f"========================= validation ==============================")
-    is_team_member = check_quotation_owner(doc, user)
-    print(f"validate",is_team_member)
-
-    allowed_roles = {
-        "Sales Manager - Network",
-        "Product MGR - Network",
-        "Sales Coordinator - Network DEPT",
-        "Sales Master Manager - Network"
-        }
     allowed_ptypes = ("read", "write","create", "submit", "cancel")
 
-    has_allowed_role = bool(allowed_roles.intersection(roles))
-    if ptype in allowed_ptypes and is_team_member and has_allowed_role:
-
+    # the owner's team is only built for users the policy gives team access
+    if ptype in allowed_ptypes and access == "team" and check_quotation_owner(doc, user):
         return True
 
     if not doc.owner:
         return check_quotation_owner(doc, user)
     # ===== SENIOR SALES =====
-    if "Senior Sales - Network DEPT" in roles:
+    if context.has_class("network_senior"):
         # check account_manager safely
         if hasattr(doc, "account_manager") and doc.account_manager:
-            employee = frappe.db.get_value("Employee", {"user_id": user}, "name")
+            employee = context.employee
             if employee and doc.account_manager == employee:
                 return True
 
     # ===== JUNIOR SALES =====
-    if "Junior Sales - Network DEPT" in roles:
+    if context.has_class("network_junior"):
         if hasattr(doc, "account_manager") and doc.account_manager:
-            employee = frappe.db.get_value("Employee", {"user_id": user}, "name")
+            employee = context.employee
             if employee and doc.account_manager == employee:
                 return True
 
@@ -167,16 +133,12 @@ def check_quotation_owner(doc, user=None):
     if user == "Administrator":
         return True
 
-    roles = frappe.get_roles(user)
-
     try:
         # 1. Get Document Owner
         quotation_owner = doc.owner
-        print(f" Quotation: {doc.name}  Owner: {quotation_owner}")
 
-        # 2. Build Team
-        team_members = get_team_hierarchy(quotation_owner)
-        print(f"Team Members: {team_members}")
+        # 2. Build Team (once per owner for the whole request)
+        team_members = get_owner_team(quotation_owner)
 
         # 3. Check if User is Part of Team
         if user in team_members:
@@ -190,3 +152,63 @@ def check_quotation_owner(doc, user=None):
         return False
 
 
+def get_owner_team(owner):
+    """Request-scoped memo of owner -> team members, filled in bulk by `prime_owner_teams`."""
+    teams = get_owner_teams_memo()
+    if owner not in teams:
+        teams[owner] = frozenset(get_team_hierarchy(owner))
+    return teams[owner]
+
+
+def prime_owner_teams(owners):
+    teams = get_owner_teams_memo()
+    missing = [owner for owner in set(owners) if owner and owner not in teams]
+    for owner, members in get_team_hierarchies(missing).items():
+        teams[owner] = frozenset(members)
+
+
+def get_owner_teams_memo():
+    if not hasattr(frappe.local, "dms_quotation_owner_teams"):
+        frappe.local.dms_quotation_owner_teams = {}
+    return frappe.local.dms_quotation_owner_teams
+
+
+def get_quotation_permissions(docs, ptype="read", user=None):
+    """
+    Evaluate `has_permission` for many Quotations at once (print, export, bulk submit).
+
+    Args:
+        docs: Quotation names, dicts or docs. Names are loaded in one query.
+        ptype: permission type checked for every doc.
+        user: defaults to the session user.
+
+    Returns:
+        dict: {quotation name: bool}
+
+    The distinct owners' teams are built together in one query and kept in
+    the request memo, so the per-doc checks below never rebuild a team.
+    """
+    if not user:
+        user = frappe.session.user
+
+    # iterated more than once below, a generator would come back empty
+    docs = list(docs)
+    names = [d for d in docs if isinstance(d, str)]
+    docs = [d for d in docs if not isinstance(d, str)]
+    if names:
+        fields = ["name", "owner"]
+        if frappe.db.has_column("Quotation", "account_manager"):
+            fields.append("account_manager")
+
+        docs += frappe.get_all("Quotation", filters={"name": ["in", names]}, fields=fields)
+
+    if get_user_context(user).decide("quotation_access") == "team":
+        prime_owner_teams(doc.get("owner") for doc in docs)
+
+    permissions = {name: False for name in names}
+    for doc in docs:
+        if not isinstance(doc, frappe._dict) and isinstance(doc, dict):
+            doc = frappe._dict(doc)
+        permissions[doc.name] = bool(has_permission(doc, ptype=ptype, user=user))
+
+    return permissions
@@ -1,47 +1,33 @@
 import frappe
 from frappe import _
 from dms_plus.crm_permissions.utils import get_team_hierarchy, get_network_user_query
+from dms_plus.crm_permissions.cache import cached_query_conditions
+from dms_plus.crm_permissions.context import get_user_context
+from dms_plus.crm_permissions.network_users import get_non_network_owner_condition
+from dms_plus.crm_permissions.tracing import traced
 
+@traced("Sales Order.get_permission_query_conditions")
+@cached_query_conditions("Sales Order")
 def get_permission_query_conditions(user=None):
     """
         Sales Order View Permission Check
     """
-    NETWORK_ROLES = {
-        "Sales Master Manager - Network",
-        "Sales Manager - Network",
-        "Product MGR - Network",
-        "Sales Coordinator - Network DEPT",
-        "Senior Sales - Network DEPT",
-        "Junior Sales - Network DEPT",
-    }
     if not user:
         user = frappe.session.user
 
-    roles = frappe.get_roles(user)
-    print(f"User: {user} & Roles: {roles}")
+    # see policy.order_scope
+    scope = "all" if user == "Administrator" else get_user_context(user).decide("order_scope")
+
     # ===== DEFAULT (Owner only) =====
-    if user != "Administrator" and "CEO" not in roles:
-        is_network_user = any(role in NETWORK_ROLES for role in roles)
-
-        if not is_network_user:
-            return """
-                `tabSales Order`.owner NOT IN (
-                    select hr.parent
-                    from `tabHas Role` hr
-                    where hr.role in ({roles})
-                    and hr.parenttype = "User"
-                )
-            """.format(
-                roles=", ".join(frappe.db.escape(r) for r in NETWORK_ROLES)
-            )
+    if scope == "non_network":
+        return get_non_network_owner_condition("Sales Order")
 
     # ===== ADMIN & CEO =====
-    top_roles = ["Administrator", "CEO"]
-    if any(role in roles for role in top_roles):
+    if scope == "all":
         return ""
-    # ===== TOP Managers =====
-    manager_roles = {"Sales Manager - Network", "Product MGR - Network", "Sales Master Manager - Network"}
-    if manager_roles.intersection(roles):
+
+    # ==== TOP Managers =====
+    if scope == "team":
 
         team_members = get_team_hierarchy(user)
         if not team_members:
@@ -51,12 +37,8 @@ def get_permission_query_conditions(user=None):
         members = " ,".join(
             frappe.db.escape(member) for member in team_members
             )
-        print("members: ",members)
         return f"`tabSales Order`.owner IN ({members})"
 
-    is_junior = "Junior Sales - Network DEPT" in roles
-    is_senior = "Senior Sales - Network DEPT" in roles
-    is_coordinator = "Sales Coordinator - Network DEPT" in roles
-    # ===== JUNIOR SALES =====
-    if is_junior or is_senior or is_coordinator:
+    # ===== JUNIOR / SENIOR / COORDINATOR =====
+    if scope == "own":
         return get_network_user_query(user, doctype="Sales Order", include_account_manager=True)
@@ -0,0 +1,146 @@
+"""
+Sampled timing tracer for the permission hooks and the Quotation Follow-up report.
+
+Off by default. Enable it in site_config.json:
+
+    "dms_plus_trace_sample_rate": 0.05      # trace 5% of the calls
+    "dms_plus_trace_buffer_size": 1000      # entries kept, optional
+
+Each sampled call records its wall time, the number of SQL queries it ran
+and the length of the condition it returned. Entries are pushed to a redis
+list trimmed to the buffer size, so the newest ones are always kept.
+
+Read them as System Manager from the `get_trace` / `get_trace_summary`
+methods, or from bench:
+
+    bench --site <site> execute dms_plus.crm_permissions.tracing.get_trace_summary
+"""
+
+import functools
+import inspect
+import json
+import random
+import time
+
+import frappe
+
+TRACE_KEY = "dms_plus:permission_trace"
+DEFAULT_BUFFER_SIZE = 1000
+
+
+def traced(name):
+    """Trace calls to the wrapped function under `name` when sampled."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            sample_rate = frappe.conf.get("dms_plus_trace_sample_rate")
+            if not sample_rate or random.random() >= float(sample_rate):
+                return fn(*args, **kwargs)
+
+            counter, restore = count_queries()
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                restore()
+
+            record(name, elapsed, counter[0], result)
+            return result
+
+        # frappe.call passes only the arguments the hook declares (e.g. not `doctype`
+        # to a conditions builder), keep that working through the wrapper
+        wrapper.fnargs = inspect.getfullargspec(fn).args
+        return wrapper
+
+    return decorator
+
+
+def count_queries():
+    """Count `frappe.db.sql` calls until `restore()` is called."""
+    db = frappe.db
+    own_attribute = "sql" in vars(db)
+    original = db.sql
+    counter = [0]
+
+    def sql(*args, **kwargs):
+        counter[0] += 1
+        return original(*args, **kwargs)
+
+    def restore():
+        if own_attribute:
+            db.sql = original
+        else:
+            del db.sql
+
+    db.sql = sql
+    return counter, restore
+
+
+def record(name, elapsed, queries, result):
+    entry = {
+        "name": name,
+        "user": frappe.session.user,
+        "ms": round(elapsed * 1000, 3),
+        "queries": queries,
+        "condition_length": len(result) if isinstance(result, str) else None,
+        "at": time.time(),
+    }
+
+    buffer_size = int(frappe.conf.get("dms_plus_trace_buffer_size") or DEFAULT_BUFFER_SIZE)
+    try:
+        frappe.cache.lpush(TRACE_KEY, json.dumps(entry))
+        frappe.cache.ltrim(TRACE_KEY, 0, buffer_size - 1)
+    except Exception:
+        # tracing must never break the call it measures
+        frappe.logger().error("dms_plus tracer: could not record entry", exc_info=True)
+
+
+@frappe.whitelist()
+def get_trace(limit=100, name=None):
+    """Newest entries first, optionally only the ones recorded under `name`."""
+    frappe.only_for("System Manager")
+
+    entries = [json.loads(raw) for raw in frappe.cache.lrange(TRACE_KEY, 0, -1)]
+    if name:
+        entries = [e for e in entries if e["name"] == name]
+
+    return entries[: int(limit)]
+
+
+@frappe.whitelist()
+def get_trace_summary():
+    """Count, p50 / p95 / max milliseconds and average queries per traced name."""
+    frappe.only_for("System Manager")
+
+    by_name = {}
+    for raw in frappe.cache.lrange(TRACE_KEY, 0, -1):
+        entry = json.loads(raw)
+        by_name.setdefault(entry["name"], []).append(entry)
+
+    summary = {}
+    for name, entries in by_name.items():
+        timings = sorted(e["ms"] for e in entries)
+        summary[name] = {
+            "calls": len(entries),
+            "p50_ms": percentile(timings, 50),
+            "p95_ms": percentile(timings, 95),
+            "max_ms": timings[-1],
+            "avg_queries": round(sum(e["queries"] for e in entries) / len(entries), 2),
+        }
+
+    return summary
+
+
+@frappe.whitelist()
+def clear_trace():
+    frappe.only_for("System Manager")
+    frappe.cache.delete_value(TRACE_KEY)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    index = max(0, -(-len(values) * pct // 100) - 1)
+    return values[int(index)]
@@ -1,26 +1,32 @@
 import frappe
 from frappe import _
+from dms_plus.dms_plus.doctype.dms_employee_closure.dms_employee_closure import CLOSURE_TABLE
+from dms_plus.crm_permissions.context import get_user_context
+
+TEAM_HIERARCHY_QUERY = f"""
+    SELECT member.user_id
+    FROM `tabEmployee` owner
+    JOIN {CLOSURE_TABLE} c ON c.ancestor = owner.name
+    JOIN `tabEmployee` member ON member.name = c.descendant
+    WHERE owner.user_id = %(user)s
+    UNION
+    SELECT member.user_id
+    FROM `tabEmployee` owner
+    JOIN {CLOSURE_TABLE} c ON c.descendant = owner.name
+    JOIN `tabEmployee` member ON member.name = c.ancestor
+    WHERE owner.user_id = %(user)s
+"""
 
-def get_team_hierarchy(owner_user):
 
+def get_team_hierarchy(owner_user):
+    """
+    Returns the users of the owner's team: the owner, everyone under them and
+    every manager above them, read from the Employee closure table in one query.
+    """
     try:
+        team_users = frappe.db.sql_list(TEAM_HIERARCHY_QUERY, {"user": owner_user})
 
-        owner_employee = frappe.get_doc("Employee", {"user_id": owner_user})
-        owner_emp_name = owner_employee.name
-        print(f"Owner Employee: {owner_emp_name}")
-
-        team_users = [owner_user]
-
-
-        subordinates = get_all_subordinates(owner_emp_name)
-        if subordinates:
-            team_users.extend(subordinates)
-
-        managers = get_all_managers(owner_emp_name)
-        if managers:
-            team_users.extend(managers)
-
-        team_users = list(set([u for u in team_users if u]))
+        team_users = list(set([u for u in [owner_user, *team_users] if u]))
         team_users.sort()
 
         return team_users
@@ -31,57 +37,85 @@ def get_team_hierarchy(owner_user):
         return [owner_user]
 
 
-def get_all_subordinates(emp_name, visited=None):
-
-    if visited is None:
-        visited = set()
-
-    if emp_name in visited:
-        return []
-
-    visited.add(emp_name)
-    subordinates = []
-
-    try:
-        junior_employees = frappe.get_all(
-            "Employee",
-            filters={"reports_to": emp_name},
-            fields=["name", "user_id"]
-        )
-
-        for emp in junior_employees:
-            if emp.user_id:
-                subordinates.append(emp.user_id)
-                subordinates.extend(get_all_subordinates(emp.name, visited))
-    except Exception as e:
-        frappe.logger().error(f"Error getting subordinates for {emp_name}: {str(e)}")
-
-    return subordinates
-
-
-def get_all_managers(emp_name, visited=None):
-
-    if visited is None:
-        visited = set()
+def get_team_hierarchies(owner_users):
+    """
+    Same as `get_team_hierarchy`, for many owners in one query.
 
-    if emp_name in visited:
-        return []
+    Returns:
+        dict: {owner_user: [team users, sorted]}, every owner is present.
+    """
+    owner_users = tuple(set(u for u in owner_users if u))
+    if not owner_users:
+        return {}
+
+    rows = frappe.db.sql(f"""
+        SELECT owner.user_id AS owner_user, member.user_id AS member_user
+        FROM `tabEmployee` owner
+        JOIN {CLOSURE_TABLE} c ON c.ancestor = owner.name
+        JOIN `tabEmployee` member ON member.name = c.descendant
+        WHERE owner.user_id IN %(users)s
+        UNION
+        SELECT owner.user_id AS owner_user, member.user_id AS member_user
+        FROM `tabEmployee` owner
+        JOIN {CLOSURE_TABLE} c ON c.descendant = owner.name
+        JOIN `tabEmployee` member ON member.name = c.ancestor
+        WHERE owner.user_id IN %(users)s
+    """, {"users": owner_users}, as_dict=True)
+
+    teams = {owner: {owner} for owner in owner_users}
+    for row in rows:
+        if row.member_user:
+            teams[row.owner_user].add(row.member_user)
+
+    return {owner: sorted(members) for owner, members in teams.items()}
+
+
+def get_all_subordinates(emp_name):
+    """Users of every employee under `emp_name`, at any depth."""
+    return frappe.db.sql_list(f"""
+        SELECT e.user_id
+        FROM {CLOSURE_TABLE} c
+        JOIN `tabEmployee` e ON e.name = c.descendant
+        WHERE c.ancestor = %s AND c.depth > 0 AND IFNULL(e.user_id, '') != ''
+        ORDER BY c.depth
+    """, emp_name)
+
+
+def get_all_managers(emp_name):
+    """Users of every manager above `emp_name`, nearest first."""
+    return frappe.db.sql_list(f"""
+        SELECT e.user_id
+        FROM {CLOSURE_TABLE} c
+        JOIN `tabEmployee` e ON e.name = c.ancestor
+        WHERE c.descendant = %s AND c.depth > 0 AND IFNULL(e.user_id, '') != ''
+        ORDER BY c.depth
+    """, emp_name)
+
+def get_sales_persons_for_users(users):
+    """
+    Resolve users to their Sales Persons through Employee in a single query.
 
-    visited.add(emp_name)
-    managers = []
+    Returns:
+        dict: {user: [sales_person, ...]}, users without an Employee or a
+        Sales Person are left out.
+    """
+    users = tuple(set(u for u in users if u))
+    if not users:
+        return {}
 
-    try:
-        employee = frappe.get_doc("Employee", emp_name)
-        if employee.reports_to:
-            manager_emp = frappe.get_doc("Employee", employee.reports_to)
-            if manager_emp.user_id:
-                managers.append(manager_emp.user_id)
+    rows = frappe.db.sql("""
+        SELECT e.user_id, sp.name AS sales_person
+        FROM `tabEmployee` e
+        JOIN `tabSales Person` sp ON sp.employee = e.name
+        WHERE e.user_id IN %(users)s
+        ORDER BY sp.creation
+    """, {"users": users}, as_dict=True)
 
-                managers.extend(get_all_managers(employee.reports_to, visited))
-    except Exception as e:
-        frappe.logger().error(f"Error getting managers for {emp_name}: {str(e)}")
+    sales_persons = {}
+    for row in rows:
+        sales_persons.setdefault(row.user_id, []).append(row.sales_person)
 
-    return managers
+    return sales_persons
 
 def get_network_user_query(user, doctype, include_account_manager):
     """
@@ -93,14 +127,12 @@ def get_network_user_query(user, doctype, include_account_manager):
     try:
 
         conditions = [f"{tab}.owner={frappe.db.escape(user)}"]
-        if not frappe.db.exists("Employee", {"user_id": user}):
+        employee = get_user_context(user).employee
+        if not employee:
             return conditions[0]
 
-
         if include_account_manager and frappe.db.has_column(doctype, "account_manager"):
-            employee = frappe.get_doc("Employee", {"user_id": user})
-            if employee:
-                conditions.append(f"{tab}.account_manager={frappe.db.escape(employee.name)}")
+            conditions.append(f"{tab}.account_manager={frappe.db.escape(employee)}")
 
         return " OR ".join(conditions)
 
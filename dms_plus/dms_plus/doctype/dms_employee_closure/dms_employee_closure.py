@@ -0,0 +1,164 @@
+# Copyright (c) 2026, dms developers and contributors
+# For license information, please see license.txt
+
+"""
+Closure table for the Employee `reports_to` tree.
+
+Every (ancestor, descendant) pair of the org chart is stored as one row,
+including the (employee, employee) row with depth 0. Looking up a team is
+then a single indexed read instead of walking `reports_to` node by node.
+
+The rows are maintained from Employee doc_events (see hooks.py) and can be
+rebuilt from scratch with `rebuild_closure`, which leaves the commit to the
+caller (patch or install/backfill.py).
+"""
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+
+CLOSURE_DOCTYPE = "DMS Employee Closure"
+CLOSURE_TABLE = f"`tab{CLOSURE_DOCTYPE}`"
+
+
+class DMSEmployeeClosure(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index(CLOSURE_DOCTYPE, ["ancestor", "descendant"])
+    frappe.db.add_index(CLOSURE_DOCTYPE, ["descendant", "ancestor"])
+
+
+def get_row_name(ancestor, descendant):
+    """Deterministic row name, so the pair itself acts as the unique key."""
+    return hashlib.md5(f"{ancestor}/{descendant}".encode()).hexdigest()
+
+
+# ========== Employee doc_events ==========
+def on_employee_update(doc, method=None):
+    """
+    Re-link the employee (and everyone under them) when `reports_to` changes.
+    `on_update` also runs right after insert, so new employees land here too.
+    """
+    if doc.has_value_changed("reports_to"):
+        move_subtree(doc.name, doc.reports_to)
+
+
+def on_employee_trash(doc, method=None):
+    """Detach the employee from their managers, then drop their own rows."""
+    move_subtree(doc.name, None)
+    frappe.db.sql(
+        f"DELETE FROM {CLOSURE_TABLE} WHERE ancestor = %(employee)s OR descendant = %(employee)s",
+        {"employee": doc.name},
+    )
+
+
+def on_employee_rename(doc, method=None, old_name=None, new_name=None, merge=False):
+    """after_rename: point both columns (and the row names derived from them) at the new name."""
+    if merge:
+        # the two employees' rows would collide, rebuild instead
+        rebuild_closure()
+        return
+
+    frappe.db.sql(
+        f"""
+        UPDATE {CLOSURE_TABLE}
+        SET
+            ancestor = IF(ancestor = %(old)s, %(new)s, ancestor),
+            descendant = IF(descendant = %(old)s, %(new)s, descendant)
+        WHERE ancestor = %(old)s OR descendant = %(old)s
+        """,
+        {"old": old_name, "new": new_name},
+    )
+    # same as get_row_name
+    frappe.db.sql(
+        f"""
+        UPDATE {CLOSURE_TABLE}
+        SET name = MD5(CONCAT(ancestor, '/', descendant))
+        WHERE ancestor = %(new)s OR descendant = %(new)s
+        """,
+        {"new": new_name},
+    )
+
+
+# ========== Maintenance ==========
+def ensure_self_row(employee):
+    frappe.db.sql(
+        f"""
+        INSERT IGNORE INTO {CLOSURE_TABLE} (name, ancestor, descendant, depth)
+        VALUES (%(name)s, %(employee)s, %(employee)s, 0)
+        """,
+        {"name": get_row_name(employee, employee), "employee": employee},
+    )
+
+
+def move_subtree(employee, new_parent=None):
+    """
+    Move `employee` and all of their descendants under `new_parent`.
+
+    1. Delete the links between the subtree and its old ancestors.
+    2. Cross join the new parent's ancestors with the subtree.
+    """
+    ensure_self_row(employee)
+
+    subtree = frappe.db.sql_list(
+        f"SELECT descendant FROM {CLOSURE_TABLE} WHERE ancestor = %s", employee
+    )
+
+    frappe.db.sql(
+        f"""
+        DELETE FROM {CLOSURE_TABLE}
+        WHERE descendant IN %(subtree)s
+        AND ancestor NOT IN %(subtree)s
+        """,
+        {"subtree": tuple(subtree)},
+    )
+
+    if not new_parent:
+        return
+
+    if new_parent in subtree:
+        # NestedSet on Employee already refuses loops, never link a node under itself
+        frappe.logger().error(f"Employee closure: {new_parent} is under {employee}, skipping re-link")
+        return
+
+    ensure_self_row(new_parent)
+    frappe.db.sql(
+        f"""
+        INSERT INTO {CLOSURE_TABLE} (name, ancestor, descendant, depth)
+        SELECT
+            MD5(CONCAT(sup.ancestor, '/', sub.descendant)),
+            sup.ancestor,
+            sub.descendant,
+            sup.depth + sub.depth + 1
+        FROM {CLOSURE_TABLE} sup
+        JOIN {CLOSURE_TABLE} sub ON sub.ancestor = %(employee)s
+        WHERE sup.descendant = %(parent)s
+        """,
+        {"employee": employee, "parent": new_parent},
+    )
+
+
+def rebuild_closure():
+    """
+    Rebuild the whole closure table from `tabEmployee` in one pass.
+    Returns the number of rows, the caller commits.
+
+    Usage: bench --site <site> execute dms_plus.install.backfill.rebuild_employee_closure
+    """
+    parent_of = dict(frappe.get_all("Employee", fields=["name", "reports_to"], as_list=True))
+
+    rows = []
+    for employee in parent_of:
+        node, depth, seen = employee, 0, set()
+        while node and node not in seen:
+            seen.add(node)
+            rows.append((get_row_name(node, employee), node, employee, depth))
+            node = parent_of.get(node)
+            depth += 1
+
+    frappe.db.delete(CLOSURE_DOCTYPE)
+    frappe.db.bulk_insert(CLOSURE_DOCTYPE, ["name", "ancestor", "descendant", "depth"], rows)
+    return len(rows)
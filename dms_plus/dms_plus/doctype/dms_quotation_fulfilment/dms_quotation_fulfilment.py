@@ -0,0 +1,88 @@
+# Copyright (c) 2026, dms developers and contributors
+# For license information, please see license.txt
+
+"""
+Ordered qty per (quotation, item_code), summed over submitted Sales Orders.
+
+The Quotation Follow-up report reads this small table instead of
+aggregating `tabSales Order Item` on every run. Rows are refreshed for the
+quotations of a Sales Order when it is submitted, cancelled or updated
+after submit, and the whole table can be rebuilt with `rebuild_fulfilment`, which leaves the
+commit to the caller (patch or install/backfill.py).
+"""
+
+import frappe
+from frappe.model.document import Document
+
+FULFILMENT_DOCTYPE = "DMS Quotation Fulfilment"
+FULFILMENT_TABLE = f"`tab{FULFILMENT_DOCTYPE}`"
+
+AGGREGATE_QUERY = """
+    SELECT
+        MD5(CONCAT(soi.prevdoc_docname, '/', soi.item_code)),
+        soi.prevdoc_docname,
+        soi.item_code,
+        SUM(soi.qty)
+    FROM `tabSales Order Item` soi
+    INNER JOIN `tabSales Order` so ON so.name = soi.parent
+    WHERE so.docstatus = 1
+    AND IFNULL(soi.prevdoc_docname, '') != ''
+    {conditions}
+    GROUP BY soi.prevdoc_docname, soi.item_code
+"""
+
+
+class DMSQuotationFulfilment(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index(FULFILMENT_DOCTYPE, ["quotation", "item_code"])
+
+
+# ========== Sales Order doc_events ==========
+def on_sales_order_change(doc, method=None):
+    """on_submit / on_cancel / on_update_after_submit"""
+    items = list(doc.items)
+    # Update Items can drop a row, its quotation needs refreshing too
+    before = doc.get_doc_before_save()
+    if before:
+        items += before.items
+
+    quotations = {row.prevdoc_docname for row in items if row.prevdoc_docname}
+    if quotations:
+        refresh_fulfilment(quotations)
+
+
+def refresh_fulfilment(quotations):
+    """Recompute the rows of the given quotations from their submitted Sales Orders."""
+    quotations = tuple(quotations)
+
+    frappe.db.sql(
+        f"DELETE FROM {FULFILMENT_TABLE} WHERE quotation IN %(quotations)s",
+        {"quotations": quotations},
+    )
+    frappe.db.sql(
+        f"""
+        INSERT INTO {FULFILMENT_TABLE} (name, quotation, item_code, ordered_qty)
+        {AGGREGATE_QUERY.format(conditions="AND soi.prevdoc_docname IN %(quotations)s")}
+        """,
+        {"quotations": quotations},
+    )
+
+
+def rebuild_fulfilment():
+    """
+    Backfill the whole table from submitted Sales Orders.
+    Returns the number of rows, the caller commits.
+
+    Usage: bench --site <site> execute dms_plus.install.backfill.rebuild_quotation_fulfilment
+    """
+    frappe.db.delete(FULFILMENT_DOCTYPE)
+    frappe.db.sql(
+        f"""
+        INSERT INTO {FULFILMENT_TABLE} (name, quotation, item_code, ordered_qty)
+        {AGGREGATE_QUERY.format(conditions="")}
+        """
+    )
+    return frappe.db.count(FULFILMENT_DOCTYPE)
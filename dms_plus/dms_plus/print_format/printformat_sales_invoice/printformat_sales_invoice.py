@@ -1,13 +1,10 @@
+import frappe
+from dms_plus.print_assets import get_print_asset
+
+
 # ========== الطريقة 1: Server Script (الأفضل) ==========
 def before_render(doc, print_format):
-    try:
-        files = frappe.get_list("File",
-            filters={"file_name": "company_gif.gif"},
-            fields=["file_url"]
-        )
-        if files:
-            doc.gif_url = files[0]["file_url"]
-    except:
-        doc.gif_url = "/files/company_gif.gif"
+    # cached per company, see dms_plus.print_assets
+    doc.gif_url = get_print_asset("company_gif", doc.get("company"))
 
     return doc
@@ -66,6 +66,19 @@
             },
         ],
      onload: function (report) {
+        ["csv", "parquet"].forEach((file_format) => {
+            report.page.add_inner_button(file_format.toUpperCase(), () => {
+                const args = {
+                    filters: JSON.stringify(report.get_filter_values()),
+                    file_format: file_format,
+                };
+                window.open(
+                    "/api/method/dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.export?"
+                    + new URLSearchParams(args).toString()
+                );
+            }, __("Stream Export"));
+        });
+
         frappe.model.with_doctype("Quotation", function () {
             const meta = frappe.get_meta("Quotation");
             const status_field = meta.fields.find(
@@ -1,9 +1,24 @@
 # Copyright (c) 2025, dms developers and contributors
 # For license information, please see license.txt
 
+import csv
+import hashlib
+import io
+import json
+import tempfile
+import zlib
+
 import frappe
 from frappe import _
+from frappe.desk.reportview import get_match_cond
+from frappe.permissions import can_export
+from frappe.utils import cint, flt, nowdate
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+from dms_plus.dms_plus.doctype.dms_quotation_fulfilment.dms_quotation_fulfilment import FULFILMENT_TABLE
+from dms_plus.crm_permissions.tracing import traced
 from pprint import pprint
+@traced("Quotation Follow-up.execute")
 def execute(filters: dict | None = None):
     """Main entry point for Pipeline Follow-up Report"""
     columns = get_columns()
@@ -125,30 +140,63 @@ def get_columns() -> list[dict]:
         },
     ]
 
-def get_quotation_data(filters: dict | None = None) -> list:
-    """Fetch Quotations and their related Sales Orders"""
+# quotations per page, a page is read in one query with its ordered qty
+PAGE_LENGTH = 500
+
+QUOTATION_FIELDS = """
+    `tabQuotation`.workflow_state as quote_state,
+    `tabQuotation`.status as quotation_status,
+    `tabQuotation`.transaction_date,
+    `tabQuotation`.name as quotation_name,
+    `tabQuotation`.customer_name,
+    `tabQuotation`.selling_price_list as price_list,
+    qi.item_code,
+    qi.item_group,
+    qi.qty,
+    qi.amount,
+    qi.rate,
+    qi.distributed_discount_amount as discount,
+    qi.net_rate,
+    qi.net_amount,
+    CASE
+        WHEN ROW_NUMBER() OVER (PARTITION BY `tabQuotation`.name ORDER BY qi.idx) = 1 THEN `tabQuotation`.net_total
+    END as quotation_net_total,
+    qi.warehouse,
+    IFNULL(f.ordered_qty, 0) as ordered_qty
+"""
+
+# net total only on the first item row of each quotation, ordered qty from the summary table
+QUOTATION_ROWS_FROM = f"""
+    `tabQuotation`
+    LEFT JOIN `tabQuotation Item` qi ON qi.parent = `tabQuotation`.name
+    LEFT JOIN {FULFILMENT_TABLE} f ON f.quotation = `tabQuotation`.name AND f.item_code = qi.item_code
+"""
+
+
+def get_conditions(filters: dict | None = None) -> tuple[str, dict]:
+    """Build the WHERE clause shared by the page, row and count queries"""
     filters = filters or {}
     where_conditions = []
     params = {}
 
     if  filters.get("quote_state"):
-        where_conditions.append("q.workflow_state = %(quote_state)s")
+        where_conditions.append("`tabQuotation`.workflow_state = %(quote_state)s")
         params["quote_state"] = filters.get("quote_state")
 
     if filters.get("quotation_name"):
-        where_conditions.append("q.name = %(quotation_name)s")
+        where_conditions.append("`tabQuotation`.name = %(quotation_name)s")
         params["quotation_name"] = filters.get("quotation_name")
 
     if filters.get("quotation_status"):
-        where_conditions.append("q.status = %(quotation_status)s")
+        where_conditions.append("`tabQuotation`.status = %(quotation_status)s")
         params["quotation_status"] = filters.get("quotation_status")
 
     if filters.get("from_date"):
-        where_conditions.append("q.transaction_date >= %(from_date)s")
+        where_conditions.append("`tabQuotation`.transaction_date >= %(from_date)s")
         params["from_date"] = filters.get("from_date")
 
     if filters.get("to_date"):
-        where_conditions.append("q.transaction_date <= %(to_date)s")
+        where_conditions.append("`tabQuotation`.transaction_date <= %(to_date)s")
         params["to_date"] = filters.get("to_date")
 
     if filters.get("item"):
@@ -160,7 +208,7 @@ def get_quotation_data(filters: dict | None = None) -> list:
         params["item_group"] = filters.get("item_group")
 
     if filters.get("customer_name"):
-        where_conditions.append("q.customer_name = %(customer_name)s")
+        where_conditions.append("`tabQuotation`.customer_name = %(customer_name)s")
         params["customer_name"] = filters.get("customer_name")
 
     if filters.get("warehouse"):
@@ -169,77 +217,262 @@ def get_quotation_data(filters: dict | None = None) -> list:
 
     where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
 
-    print("where_clause", where_clause)
-    query = f"""
-        SELECT
-            q.workflow_state as quote_state,
-            q.status as quotation_status,
-            q.transaction_date,
-            q.name as quotation_name,
-            q.customer_name,
-            q.selling_price_list as price_list,
-            qi.item_code,
-            qi.item_group,
-            qi.qty,
-            qi.amount,
-            qi.rate,
-            qi.distributed_discount_amount as discount,
-            qi.net_rate,
-            qi.net_amount,
-            q.net_total as quotation_net_total,
-            qi.warehouse
-        FROM `tabQuotation` q
-        LEFT JOIN `tabQuotation Item` qi ON qi.parent = q.name
-        WHERE {where_clause}
-        ORDER BY q.transaction_date DESC
+    # same scope as the Quotation list view, applied by the database
+    where_clause += get_scope_condition()
+    return where_clause, params
+
+
+def get_quotation_page(filters: dict | None = None, after: tuple | None = None, page_length: int = PAGE_LENGTH) -> tuple[list, tuple | None]:
     """
+    One page of report rows, keyset paginated on (transaction_date, name) DESC.
 
-    try:
-        results = frappe.db.sql(query, params, as_dict=True)
+    A page holds `page_length` quotations with all of their items, so a
+    quotation is never split across pages.
+
+    Returns:
+        (rows, after) where `after` is the key to pass for the next page,
+        None on the last page.
+    """
+    where_clause, params = get_conditions(filters)
 
-        quotation_names = list(
-                {row.quotation_name for row in results if row.quotation_name}
+    if after:
+        where_clause += """
+            AND (
+                `tabQuotation`.transaction_date < %(after_date)s
+                OR (`tabQuotation`.transaction_date = %(after_date)s AND `tabQuotation`.name < %(after_name)s)
             )
-        if not quotation_names:
-            return results
-
-        if quotation_names:
-            ordered_data = frappe.db.sql("""
-                    SELECT
-                        soi.prevdoc_docname AS quotation_name,
-                        soi.item_code,
-                        SUM(soi.qty) AS ordered_qty
-                    FROM
-                        `tabSales Order Item` soi
-                    INNER JOIN
-                        `tabSales Order` so
-                        ON so.name = soi.parent
-                    WHERE
-                        so.docstatus = 1
-                        AND soi.prevdoc_docname IN %(quotation_names)s
-                    GROUP BY
-                        soi.prevdoc_docname,
-                        soi.item_code
-                """, {
-                    "quotation_names": tuple(quotation_names)
-                }, as_dict=True)
-            ordered_map = {
-                (row.quotation_name, row.item_code): row.ordered_qty
-                for row in ordered_data
-            }
-
-            for row in results:
-                row.ordered_qty = ordered_map.get((row.quotation_name, row.item_code), 0)
-
-                if not hasattr(get_quotation_data, 'last_quotation'):
-                    get_quotation_data.last_quotation = None
-                if row.quotation_name != get_quotation_data.last_quotation:
-                    get_quotation_data.last_quotation = row.quotation_name
-                else:
-                    row.quotation_net_total = None
-
-        return results
+        """
+        params["after_date"], params["after_name"] = after
+
+    params["page_length"] = page_length
+    page_keys = frappe.db.sql(f"""
+        SELECT DISTINCT `tabQuotation`.transaction_date, `tabQuotation`.name
+        FROM `tabQuotation`
+        LEFT JOIN `tabQuotation Item` qi ON qi.parent = `tabQuotation`.name
+        WHERE {where_clause}
+        ORDER BY `tabQuotation`.transaction_date DESC, `tabQuotation`.name DESC
+        LIMIT %(page_length)s
+    """, params)
+
+    if not page_keys:
+        return [], None
+
+    params["quotation_names"] = tuple(name for _date, name in page_keys)
+    rows = frappe.db.sql(f"""
+        SELECT {QUOTATION_FIELDS}
+        FROM {QUOTATION_ROWS_FROM}
+        WHERE {where_clause}
+        AND `tabQuotation`.name IN %(quotation_names)s
+        ORDER BY `tabQuotation`.transaction_date DESC, `tabQuotation`.name DESC, qi.idx
+    """, params, as_dict=True)
+
+    next_after = tuple(page_keys[-1]) if len(page_keys) == page_length else None
+    return rows, next_after
+
+
+def get_quotation_count(filters: dict | None = None) -> dict:
+    """Totals for the paginated mode, computed apart from the pages"""
+    where_clause, params = get_conditions(filters)
+    counts = frappe.db.sql(f"""
+        SELECT COUNT(DISTINCT `tabQuotation`.name) AS quotations, COUNT(*) AS item_rows
+        FROM `tabQuotation`
+        LEFT JOIN `tabQuotation Item` qi ON qi.parent = `tabQuotation`.name
+        WHERE {where_clause}
+    """, params, as_dict=True)
+    return counts[0]
+
+
+def iter_quotation_pages(filters: dict | None = None, page_length: int = PAGE_LENGTH):
+    after = None
+    while True:
+        rows, after = get_quotation_page(filters, after, page_length)
+        if rows:
+            yield rows
+        if not after:
+            break
+
+
+def get_quotation_data(filters: dict | None = None) -> list:
+    """Fetch Quotations and their related Sales Orders"""
+    try:
+        return get_cached_result(filters, fetch_quotation_rows)
     except Exception as e:
         frappe.msgprint(f"Error fetching data: {str(e)}")
         return []
 
+
+def fetch_quotation_rows(filters: dict | None = None) -> list:
+    results = []
+    for rows in iter_quotation_pages(filters):
+        results.extend(rows)
+
+    return results
+
+
+# ========== Result cache ==========
+# zlib-compressed JSON rows, keyed by filters + the user's permission scope
+# + the result version, bumped on every change so stale entries just expire
+RESULT_CACHE_KEY = "dms_plus:quotation_follow_up"
+RESULT_VERSION_KEY = "dms_plus:quotation_follow_up_version"
+RESULT_CACHE_TTL = 6 * 60 * 60
+
+
+def get_scope_condition() -> str:
+    """The session user's Quotation match conditions, as list views apply them"""
+    return get_match_cond("Quotation")
+
+
+def get_result_cache_key(filters: dict | None = None) -> str:
+    digest = hashlib.sha1(
+        frappe.as_json([filters or {}, get_scope_condition()], indent=None).encode()
+    ).hexdigest()
+    version = frappe.cache.get_value(RESULT_VERSION_KEY) or 0
+    return f"{RESULT_CACHE_KEY}:{version}:{digest}"
+
+
+def get_cached_result(filters: dict | None, fetch) -> list:
+    """
+    Serve the rows from the result cache, or run `fetch(filters)` and store them.
+
+    Users with the same permission scope share an entry. A Quotation or
+    Sales Order change bumps the version in the key (`clear_result_cache`),
+    so a cached result is never older than the data it was built from.
+    """
+    key = get_result_cache_key(filters)
+
+    cached = frappe.cache.get_value(key)
+    if cached is not None:
+        return json.loads(zlib.decompress(cached))
+
+    rows = fetch(filters)
+    frappe.cache.set_value(
+        key,
+        zlib.compress(frappe.as_json(rows, indent=None).encode()),
+        expires_in_sec=RESULT_CACHE_TTL,
+    )
+    return rows
+
+
+def clear_result_cache(doc=None, method=None):
+    """Quotation and Sales Order doc_events: one SET, old entries expire after RESULT_CACHE_TTL"""
+    frappe.cache.set_value(RESULT_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+def check_report_permission():
+    if not frappe.get_doc("Report", "Quotation Follow-up").is_permitted():
+        frappe.throw(_("You don't have access to Report: {0}").format("Quotation Follow-up"), frappe.PermissionError)
+
+
+@frappe.whitelist()
+@traced("Quotation Follow-up.get_page")
+def get_page(filters: str | dict | None = None, after: str | list | None = None, page_length: int = PAGE_LENGTH) -> dict:
+    """
+    Paginated mode for API clients and large date ranges.
+
+    Pass back `after` from the previous response to get the next page.
+    """
+    check_report_permission()
+    filters = frappe.parse_json(filters) or {}
+    after = frappe.parse_json(after) or None
+    page_length = max(1, min(cint(page_length) or PAGE_LENGTH, PAGE_LENGTH))
+
+    rows, next_after = get_quotation_page(filters, tuple(after) if after else None, page_length)
+    return {"rows": rows, "after": next_after}
+
+
+@frappe.whitelist()
+@traced("Quotation Follow-up.get_total")
+def get_total(filters: str | dict | None = None) -> dict:
+    check_report_permission()
+    return get_quotation_count(frappe.parse_json(filters) or {})
+
+
+# ========== Export ==========
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+NUMERIC_FIELDTYPES = ("Currency", "Float", "Int", "Percent")
+
+
+@frappe.whitelist()
+def export(filters: str | dict | None = None, file_format: str = "csv"):
+    """
+    Stream the report to CSV, Parquet or Arrow, one page at a time.
+
+    Pages are written to an anonymous temp file as they are read, so memory
+    stays at one page (PAGE_LENGTH quotations) whatever the row count, and
+    the file is handed to the response without being loaded back.
+    Parquet and Arrow need `pyarrow` installed on the bench.
+    """
+    check_report_permission()
+    can_export("Quotation", raise_exception=True)
+
+    if file_format not in EXPORT_FORMATS:
+        frappe.throw(_("Unsupported export format: {0}").format(file_format))
+
+    filters = frappe.parse_json(filters) or {}
+    columns = get_columns()
+    pages = iter_quotation_pages(filters)
+
+    out = tempfile.TemporaryFile()
+    if file_format == "csv":
+        write_csv(out, columns, pages)
+    else:
+        write_arrow(out, columns, pages, file_format)
+    out.seek(0)
+
+    filename = f"quotation_follow_up_{nowdate()}.{file_format}"
+    response = Response(
+        wrap_file(frappe.local.request.environ, out),
+        mimetype=EXPORT_FORMATS[file_format],
+        direct_passthrough=True,
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_csv(out, columns, pages):
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow([col["label"] for col in columns])
+
+    for rows in pages:
+        writer.writerows([row.get(col["fieldname"]) for col in columns] for row in rows)
+
+    text.flush()
+    text.detach()
+
+
+def write_arrow(out, columns, pages, file_format):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        frappe.throw(_("{0} export needs the pyarrow package").format(file_format.title()))
+
+    def get_type(col):
+        if col["fieldtype"] in NUMERIC_FIELDTYPES:
+            return pa.float64()
+        if col["fieldtype"] == "Date":
+            return pa.date32()
+        return pa.string()
+
+    schema = pa.schema([(col["fieldname"], get_type(col)) for col in columns])
+    numeric = [col["fieldname"] for col in columns if col["fieldtype"] in NUMERIC_FIELDTYPES]
+
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(out, schema)
+    else:
+        writer = pa.ipc.new_file(out, schema)
+
+    with writer:
+        for rows in pages:
+            for row in rows:
+                # decimals from the driver, arrow wants plain floats
+                for fieldname in numeric:
+                    if row.get(fieldname) is not None:
+                        row[fieldname] = flt(row[fieldname])
+
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
@@ -1,3 +1,5 @@
+from dms_plus.scope_registry import SCOPE_REGISTRY as _SCOPE_REGISTRY
+
 app_name = "dms_plus"
 app_title = "dms_plus"
 app_publisher = "dms developers"
@@ -84,11 +86,29 @@ add_to_apps_screen = [
 # 	"methods": "dms_plus.utils.jinja_methods",
 # 	"filters": "dms_plus.utils.jinja_filters"
 # }
+jinja = {
+    "methods": [
+        "dms_plus.print_context.get_print_context",
+        "dms_plus.print_assets.get_print_asset",
+        "dms_plus.print_templates.render_dms_print",
+    ],
+}
 
 # Installation
 # ------------
 
-after_install = "dms_plus.install.roles.after_install"
+after_install = [
+    "dms_plus.install.roles.after_install",
+    "dms_plus.install.fileds.create_network_user_fields",
+    "dms_plus.crm_permissions.network_users.sync_network_users",
+    "dms_plus.install.indexes.create_indexes",
+    "dms_plus.install.backfill.rebuild_employee_closure",
+    "dms_plus.install.backfill.rebuild_quotation_fulfilment",
+]
+after_migrate = [
+    "dms_plus.install.indexes.create_indexes",
+    "dms_plus.print_templates.warm_up",
+]
 # before_install = "dms_plus.install.before_install"
 # after_install = "dms_plus.install.after_install"
 
@@ -97,6 +117,7 @@ after_install = "dms_plus.install.roles.after_install"
 
 # before_uninstall = "dms_plus.uninstall.before_uninstall"
 # after_uninstall = "dms_plus.uninstall.after_uninstall"
+before_uninstall = "dms_plus.install.fileds.delete_network_user_fields"
 after_uninstall = "dms_plus.install.roles.after_uninstall"
 # Integration Setup
 # ------------------
@@ -141,9 +162,7 @@ after_uninstall = "dms_plus.install.roles.after_uninstall"
 # }
 #  End comment 001
 
-permission_query_conditions = {
-    "*": "dms_plus.permissions.get_scope_condition"
-}
+permission_query_conditions = dict(_SCOPE_REGISTRY)
 # doc_events = {
 #     "Quotation": {
 #         "before_cancel": "dms_plus.crm_permissions.quotation_permissions.check_quotation_owner",
@@ -151,11 +170,76 @@ permission_query_conditions = {
 # }
 
 doc_events = {
+    "Employee": {
+        "on_update": [
+            "dms_plus.dms_plus.doctype.dms_employee_closure.dms_employee_closure.on_employee_update",
+            "dms_plus.crm_permissions.cache.on_employee_change",
+        ],
+        "on_trash": [
+            "dms_plus.dms_plus.doctype.dms_employee_closure.dms_employee_closure.on_employee_trash",
+            "dms_plus.crm_permissions.cache.on_employee_change",
+        ],
+        "after_rename": [
+            "dms_plus.dms_plus.doctype.dms_employee_closure.dms_employee_closure.on_employee_rename",
+            "dms_plus.crm_permissions.cache.clear_permission_cache",
+        ],
+    },
+    "User": {
+        "validate": "dms_plus.crm_permissions.network_users.set_network_user_flag",
+        "on_update": "dms_plus.crm_permissions.cache.on_user_change",
+        "on_trash": "dms_plus.crm_permissions.cache.on_user_change",
+    },
+    "Sales Person": {
+        "on_update": "dms_plus.crm_permissions.cache.on_sales_person_change",
+        "on_trash": "dms_plus.crm_permissions.cache.on_sales_person_change",
+    },
+    "Role": {
+        "on_update": "dms_plus.crm_permissions.policy.on_role_change",
+        "on_trash": "dms_plus.crm_permissions.policy.on_role_change",
+    },
+    "Company": {
+        "on_update": "dms_plus.print_context.clear_print_context_cache",
+        "on_trash": "dms_plus.print_context.clear_print_context_cache",
+    },
+    "Address": {
+        "on_update": "dms_plus.print_context.clear_print_context_cache",
+        "on_trash": "dms_plus.print_context.clear_print_context_cache",
+    },
+    "File": {
+        "on_update": "dms_plus.print_assets.clear_print_asset_cache",
+        "on_trash": "dms_plus.print_assets.clear_print_asset_cache",
+    },
+    "Item": {
+        "on_update": "dms_plus.crm_permissions.item_permissions.clear_item_group_index",
+        "on_trash": "dms_plus.crm_permissions.item_permissions.clear_item_group_index",
+        "after_rename": "dms_plus.crm_permissions.item_permissions.clear_item_group_index",
+    },
+    "Item Group": {
+        "on_update": "dms_plus.crm_permissions.item_permissions.clear_blocked_item_groups",
+        "on_trash": "dms_plus.crm_permissions.item_permissions.clear_blocked_item_groups",
+    },
     "Sales Order": {
         "validate": "dms_plus.permissions.validate_professional_service",
+        "on_submit": [
+            "dms_plus.dms_plus.doctype.dms_quotation_fulfilment.dms_quotation_fulfilment.on_sales_order_change",
+            "dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.clear_result_cache",
+        ],
+        "on_cancel": [
+            "dms_plus.dms_plus.doctype.dms_quotation_fulfilment.dms_quotation_fulfilment.on_sales_order_change",
+            "dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.clear_result_cache",
+        ],
+        "on_update_after_submit": [
+            "dms_plus.dms_plus.doctype.dms_quotation_fulfilment.dms_quotation_fulfilment.on_sales_order_change",
+            "dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.clear_result_cache",
+        ],
     },
     "Quotation": {
         "validate": "dms_plus.permissions.validate_professional_service",
+        "on_update": "dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.clear_result_cache",
+        "on_submit": "dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.clear_result_cache",
+        "on_cancel": "dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.clear_result_cache",
+        "on_update_after_submit": "dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.clear_result_cache",
+        "on_trash": "dms_plus.dms_plus.report.quotation_follow_up.quotation_follow_up.clear_result_cache",
     }
 }
 # has_permission = {
@@ -193,6 +277,11 @@ doc_events = {
 # 		"dms_plus.tasks.monthly"
 # 	],
 # }
+scheduler_events = {
+    "hourly": [
+        "dms_plus.render_cache.evict",
+    ],
+}
 
 # Testing
 # -------
@@ -213,6 +302,9 @@ doc_events = {
 # override_whitelisted_methods = {
 # 	"frappe.desk.doctype.event.event.get_events": "dms_plus.event.get_events"
 # }
+override_whitelisted_methods = {
+    "frappe.utils.print_format.download_pdf": "dms_plus.render_cache.download_pdf",
+}
 #
 # each overriding function accepts a `data` argument;
 # generated from the base implementation of the doctype dashboard,
@@ -230,6 +322,8 @@ doc_events = {
 
 # ignore_links_on_delete = ["Communication", "ToDo"]
 
+clear_cache = "dms_plus.crm_permissions.cache.clear_permission_cache"
+
 # Request Events
 # ----------------
 # before_request = ["dms_plus.utils.before_request"]
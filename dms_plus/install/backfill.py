@@ -0,0 +1,24 @@
+import frappe
+from dms_plus.dms_plus.doctype.dms_employee_closure.dms_employee_closure import rebuild_closure
+from dms_plus.dms_plus.doctype.dms_quotation_fulfilment.dms_quotation_fulfilment import rebuild_fulfilment
+
+# bench install-app marks every patch as run, so a site installed over
+# existing Employees / Sales Orders gets its derived tables from here
+
+
+def rebuild_employee_closure():
+    """
+    Usage: bench --site <site> execute dms_plus.install.backfill.rebuild_employee_closure
+    """
+    rows = rebuild_closure()
+    frappe.db.commit()
+    print(f"Employee closure rebuilt: {rows} rows")
+
+
+def rebuild_quotation_fulfilment():
+    """
+    Usage: bench --site <site> execute dms_plus.install.backfill.rebuild_quotation_fulfilment
+    """
+    rows = rebuild_fulfilment()
+    frappe.db.commit()
+    print(f"Quotation fulfilment rebuilt: {rows} rows")
@@ -21,6 +21,21 @@ FIELDS = {
     ],
 }
 
+NETWORK_USER_FIELDS = {
+    "User": [
+        {
+            "fieldname": "dms_network_user",
+            "label": "Network User",
+            "fieldtype": "Check",
+            "insert_after": "role_profile_name",
+            "read_only": 1,
+            "hidden": 1,
+            "search_index": 1,
+            "description": "Set from the user's roles. Documents owned by Network users are hidden from other staff.",
+        },
+    ],
+}
+
 
 def before_uninstall():
     delete_custom_fields()
@@ -42,8 +57,9 @@ def get_custom_fields():
     return custom_fields
 
 
-def create_custom_fields():
-    for dt, fields in FIELDS.items():
+def create_custom_fields(fields_map=None):
+    fields_map = fields_map or FIELDS
+    for dt, fields in fields_map.items():
         for f in fields:
             if not frappe.db.exists("Custom Field", {"dt": dt, "fieldname": f["fieldname"]}):
                 doc = frappe.get_doc({
@@ -56,8 +72,9 @@ def create_custom_fields():
     frappe.db.commit()
 
 
-def delete_custom_fields():
-    for dt, fields in FIELDS.items():
+def delete_custom_fields(fields_map=None):
+    fields_map = fields_map or FIELDS
+    for dt, fields in fields_map.items():
         for f in fields:
             cf = frappe.db.exists("Custom Field", {
                 "dt": dt,
@@ -66,3 +83,11 @@ def delete_custom_fields():
             if cf:
                 frappe.delete_doc("Custom Field", cf, ignore_permissions=True)
     frappe.db.commit()
+
+
+def create_network_user_fields():
+    create_custom_fields(NETWORK_USER_FIELDS)
+
+
+def delete_network_user_fields():
+    delete_custom_fields(NETWORK_USER_FIELDS)
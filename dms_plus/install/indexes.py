@@ -0,0 +1,88 @@
+import frappe
+from frappe.model.db_query import DatabaseQuery
+
+# (doctype, fields) for every predicate the permission modules and the
+# Quotation Follow-up report filter or join on
+INDEXES = [
+    ("Quotation", ["owner"]),
+    ("Quotation", ["account_manager"]),
+    ("Quotation", ["transaction_date", "workflow_state", "status"]),
+    ("Sales Order", ["owner"]),
+    ("Sales Order", ["account_manager"]),
+    ("Customer", ["owner"]),
+    ("Customer", ["account_manager"]),
+    ("Sales Team", ["parenttype", "parent", "sales_person"]),
+    ("Sales Person", ["employee"]),
+    ("Employee", ["user_id"]),
+    ("Employee", ["reports_to"]),
+    ("Sales Order Item", ["prevdoc_docname", "item_code"]),
+    # print asset lookups, see print_assets.find_file
+    ("File", ["file_name"]),
+]
+
+# condition builders checked by `explain_permission_conditions`, next to
+# the conditions list views really apply (registered hooks + user permissions)
+CONDITION_BUILDERS = {
+    "Customer": "dms_plus.crm_permissions.customer_permissions.get_permission_query_conditions",
+    "Quotation": "dms_plus.crm_permissions.quotation_permissions.get_permission_query_conditions",
+    "Sales Order": "dms_plus.crm_permissions.sales_order_permissions.get_permission_query_conditions",
+}
+
+
+def get_index_name(fields):
+    return "dms_" + "_".join(fields)
+
+
+def create_indexes():
+    """
+    Create the composite indexes in INDEXES, skipping fields the site does
+    not have (e.g. workflow_state without a Quotation workflow).
+    Runs after install and after every migrate, existing indexes are kept.
+    """
+    for doctype, fields in INDEXES:
+        missing = [f for f in fields if not frappe.db.has_column(doctype, f)]
+        if missing:
+            print(f"Skipping index on {doctype} {fields}: missing {missing}")
+            continue
+
+        frappe.db.add_index(doctype, fields, index_name=get_index_name(fields))
+
+    frappe.db.commit()
+
+
+def explain_permission_conditions(user: str):
+    """
+    EXPLAIN the permission conditions generated for `user` and report full scans.
+
+    Usage: bench --site <site> execute dms_plus.install.indexes.explain_permission_conditions --kwargs "{'user': 'someone@example.com'}"
+    """
+    findings = []
+
+    for doctype, method in CONDITION_BUILDERS.items():
+        conditions = {"list view": DatabaseQuery(doctype, user=user).build_match_conditions()}
+        try:
+            conditions[method.rsplit(".", 2)[-2]] = frappe.get_attr(method)(user)
+        except frappe.PermissionError as e:
+            print(f"Skipping {method} for {user}: {e}")
+
+        for source, condition in conditions.items():
+            query = f"SELECT `name` FROM `tab{doctype}`"
+            if condition:
+                query += f" WHERE {condition}"
+
+            for row in frappe.db.sql(f"EXPLAIN {query}", as_dict=True):
+                finding = {
+                    "doctype": doctype,
+                    "source": source,
+                    "table": row.table,
+                    "type": row.type,
+                    "key": row.key,
+                    "rows": row.rows,
+                    "full_scan": row.type == "ALL",
+                }
+                findings.append(finding)
+
+                flag = "FULL SCAN" if finding["full_scan"] else "ok"
+                print(f"[{flag}] {doctype} ({source}): {row.table} type={row.type} key={row.key} rows={row.rows}")
+
+    return findings
@@ -1,4 +1,5 @@
 import frappe
+from frappe.utils import cint
 
 def after_install():
     create_roles()
@@ -137,7 +138,19 @@ def remove_permission_type(ptype: str):
     frappe.db.commit()
     frappe.clear_cache()
 
-def set_full_permissions():
+PERM_COLUMNS = (
+    "select", "read", "write", "create", "delete",
+    "print", "email", "report", "import", "export", "share",
+    "amend", "submit", "cancel",
+)
+FULL_ACCESS = dict.fromkeys(PERM_COLUMNS, 1)
+READ_ONLY = dict(dict.fromkeys(PERM_COLUMNS, 0), select=1, read=1, print=1, email=1, report=1)
+
+# every DocType that gets a permlevel 0 row per role
+TARGET_DOCTYPES = "SELECT name FROM `tabDocType` WHERE istable = 0 AND issingle = 0"
+
+
+def set_full_permissions(diff: bool = True):
 
     roles = [
         "System Manager",
@@ -149,80 +162,135 @@ def set_full_permissions():
         "Sales Manager - AVTECH",
         "Sales Manager - DMS",
     ]
-    all_doctypes = frappe.get_all(
-        "DocType",
-        filters={"istable": 0, "issingle": 0},
-        pluck="name"
-    )
+    provision_permissions(roles, FULL_ACCESS, diff=diff)
 
-    print(f"Found {len(all_doctypes)} DocTypes")
 
-    for role in roles:
-        print(f"Processing role: {role}")
+def set_permissions(role: str, full_access: bool = True, diff: bool = True):
+    """
+    Set custom DocPerm for a given role across all non-table, non-single DocTypes.
 
-        for doctype in all_doctypes:
-            frappe.db.sql("""
-                DELETE FROM `tabCustom DocPerm`
-                WHERE parent = %s AND role = %s AND permlevel = 0
-            """, (doctype, role))
+    Args:
+        role: The role name to set permissions for
+        full_access: If True, grant all permissions. If False, remove the role's
+            permlevel 0 rows (use grant_read_only for read-only access).
+        diff: If True, only insert missing rows and update the ones that differ.
+    """
+    if full_access:
+        provision_permissions([role], FULL_ACCESS, diff=diff)
+    else:
+        revoke_permissions([role])
+    action = "set (full access)" if full_access else "revoked"
+    print(f"Permissions {action} for role: {role}")
 
-            frappe.db.sql("""
-                INSERT INTO `tabCustom DocPerm`
-                    (name, parent, role, permlevel,
-                     `select`, `read`, `write`, `create`, `delete`,
-                     print, email, report, `import`, export, share,
-                     amend, submit, cancel)
-                VALUES
-                    (%s, %s, %s, 0,
-                     1, 1, 1, 1, 1,
-                     1, 1, 1, 1, 1, 1,
-                     1, 1, 1)
-            """, (frappe.generate_hash(length=10), doctype, role))
 
-    frappe.db.commit()
-    print("\nDone! Run: bench clear-cache")
+def grant_read_only(role: str, diff: bool = True):
+    """Give `role` the READ_ONLY flags at permlevel 0 on every non-table, non-single DocType."""
+    provision_permissions([role], READ_ONLY, diff=diff)
+    print(f"Permissions set (read-only) for role: {role}")
+
+
+def revoke_permissions(roles):
+    """Delete the roles' permlevel 0 rows on every non-table, non-single DocType, in one statement."""
+    roles = tuple(sorted(set(roles)))
+    try:
+        frappe.db.sql(f"""
+            DELETE FROM `tabCustom DocPerm`
+            WHERE role IN %(roles)s AND permlevel = 0
+            AND parent IN ({TARGET_DOCTYPES})
+        """, {"roles": roles})
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        raise
+
+    frappe.clear_cache()
+
 
+def validate_roles(roles):
+    """Throw when any of `roles` is not a Role, the INSERT ... SELECT would skip it silently."""
+    found = set(frappe.get_all("Role", filters={"name": ["in", roles]}, pluck="name"))
+    missing = [role for role in roles if role not in found]
+    if missing:
+        frappe.throw(f"Roles not found: {', '.join(missing)}")
 
-def set_permissions(role: str, full_access: bool = True):
+
+def provision_permissions(roles, perms, diff=True):
     """
-    Set custom DocPerm for a given role across all non-table, non-single DocTypes.
+    Give `roles` the `perms` flags at permlevel 0 on every non-table, non-single DocType.
 
-    Args:
-        role: The role name to set permissions for
-        full_access: If True, grant all permissions. If False, grant read-only.
+    Set-based: a handful of statements for all roles and DocTypes together,
+    instead of a DELETE + INSERT per (role, DocType).
+
+        diff=True   update only the rows whose flags differ, insert the missing ones
+        diff=False  delete the roles' permlevel 0 rows and insert them again
+
+    Runs in one transaction and clears the cache once at the end.
+    """
+    roles = sorted(set(roles))
+    validate_roles(roles)
+    values = {"roles": tuple(roles), **{f"perm_{col}": cint(perms.get(col)) for col in PERM_COLUMNS}}
+    print(f"Processing roles: {', '.join(roles)}")
+
+    # rows of these roles at permlevel 0 whose flags are not exactly `perms`
+    differs = f"""
+        role IN %(roles)s AND permlevel = 0
+        AND parent IN ({TARGET_DOCTYPES})
+        AND NOT ({" AND ".join(f"`{col}` <=> %(perm_{col})s" for col in PERM_COLUMNS)})
     """
-    all_doctypes = frappe.get_all(
-        "DocType",
-        filters={"istable": 0, "issingle": 0},
-        pluck="name"
-    )
-    print(f"Found {len(all_doctypes)} DocTypes")
-    print(f"Processing role: {role}")
 
-    for doctype in all_doctypes:
-        frappe.db.sql("""
-            DELETE FROM `tabCustom DocPerm`
-            WHERE parent = %s AND role = %s AND permlevel = 0
-        """, (doctype, role))
+    try:
+        if diff:
+            changed = frappe.db.sql(f"""
+                SELECT COUNT(*) FROM `tabCustom DocPerm` WHERE {differs}
+            """, values)[0][0]
+
+            if changed:
+                frappe.db.sql(f"""
+                    UPDATE `tabCustom DocPerm`
+                    SET {", ".join(f"`{col}` = %(perm_{col})s" for col in PERM_COLUMNS)},
+                        modified = NOW(), modified_by = %(user)s
+                    WHERE {differs}
+                """, dict(values, user=frappe.session.user))
+            print(f"Updated {changed} permissions")
+        else:
+            frappe.db.sql(f"""
+                DELETE FROM `tabCustom DocPerm`
+                WHERE role IN %(roles)s AND permlevel = 0
+                AND parent IN ({TARGET_DOCTYPES})
+            """, values)
+
+        missing = f"""
+            FROM `tabDocType` dt
+            JOIN `tabRole` r ON r.name IN %(roles)s
+            WHERE dt.istable = 0 AND dt.issingle = 0
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabCustom DocPerm` p
+                WHERE p.parent = dt.name AND p.role = r.name AND p.permlevel = 0
+            )
+        """
+        inserted = frappe.db.sql(f"SELECT COUNT(*) {missing}", values)[0][0]
 
-        if full_access:
-            frappe.db.sql("""
+        if inserted:
+            frappe.db.sql(f"""
                 INSERT INTO `tabCustom DocPerm`
-                    (name, parent, role, permlevel,
-                     `select`, `read`, `write`, `create`, `delete`,
-                     print, email, report, `import`, export, share,
-                     amend, submit, cancel)
-                VALUES
-                    (%s, %s, %s, 0,
-                     1, 1, 1, 1, 1,
-                     1, 1, 1, 1, 1, 1,
-                     1, 1, 1)
-            """, (frappe.generate_hash(length=10), doctype, role))
+                    (name, parent, parenttype, parentfield, role, permlevel,
+                     {", ".join(f"`{col}`" for col in PERM_COLUMNS)},
+                     creation, modified, owner, modified_by)
+                SELECT
+                    MD5(CONCAT(dt.name, '/', r.name, '/', UUID())), dt.name, 'DocType', 'permissions', r.name, 0,
+                    {", ".join(f"%(perm_{col})s" for col in PERM_COLUMNS)},
+                    NOW(), NOW(), %(user)s, %(user)s
+                {missing}
+            """, dict(values, user=frappe.session.user))
+        print(f"Inserted {inserted} permissions")
+
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        raise
 
-    frappe.db.commit()
-    action = "set (full access)" if full_access else "set (read-only)"
-    print(f"Done! Permissions {action} for role: {role}")
-    print("Run: bench clear-cache")
+    frappe.clear_cache()
+    print("Done!")
 
 
 def delete_permissions(role: str):
@@ -0,0 +1,45 @@
+"""
+Two level memo used by the permission conditions and the print context:
+a dict on `frappe.local` for the rest of the request, in front of a redis
+hash shared by all workers until the owner clears it.
+"""
+
+import frappe
+
+
+def get_local_cache(local_attr):
+    if not hasattr(frappe.local, local_attr):
+        setattr(frappe.local, local_attr, {})
+    return getattr(frappe.local, local_attr)
+
+
+def get_memoised(cache_key, local_attr, key, load, wrap=None):
+    """
+    Value of `key` from frappe.local.<local_attr>, else from the redis hash
+    `cache_key`, else `load()` (written to both). `wrap` is applied once to
+    what is kept for the request.
+    """
+    local_cache = get_local_cache(local_attr)
+    if key in local_cache:
+        return local_cache[key]
+
+    # stored as a 1-tuple so a cached `None` is not read back as a miss
+    cached = frappe.cache.hget(cache_key, key)
+    if cached is None:
+        cached = (load(),)
+        frappe.cache.hset(cache_key, key, cached)
+
+    value = wrap(cached[0]) if wrap else cached[0]
+    local_cache[key] = value
+    return value
+
+
+def set_memoised(cache_key, local_attr, key, value, wrap=None):
+    """Store a value loaded elsewhere (e.g. in bulk) in both levels."""
+    frappe.cache.hset(cache_key, key, (value,))
+    get_local_cache(local_attr)[key] = wrap(value) if wrap else value
+
+
+def clear_memo(cache_key, local_attr):
+    frappe.cache.delete_value(cache_key)
+    setattr(frappe.local, local_attr, {})
@@ -0,0 +1,7 @@
+from dms_plus.crm_permissions.network_users import sync_network_users
+from dms_plus.install.fileds import create_network_user_fields
+
+
+def execute():
+    create_network_user_fields()
+    sync_network_users()
@@ -0,0 +1,5 @@
+from dms_plus.dms_plus.doctype.dms_employee_closure.dms_employee_closure import rebuild_closure
+
+
+def execute():
+    rebuild_closure()
@@ -0,0 +1,5 @@
+from dms_plus.dms_plus.doctype.dms_quotation_fulfilment.dms_quotation_fulfilment import rebuild_fulfilment
+
+
+def execute():
+    rebuild_fulfilment()
@@ -1,4 +1,9 @@
 import frappe
+from dms_plus.scope_registry import SCOPE_REGISTRY
+from dms_plus.crm_permissions.context import get_user_context
+from dms_plus.crm_permissions.policy import JUNIOR_ROLES
+from dms_plus.crm_permissions.item_permissions import BLOCKED_ITEM_GROUPS, get_blocked_rows
+from dms_plus.crm_permissions.tracing import traced
 
 # def get_scope_condition(user, doctype):
 #     print(f"Checking permissions for user: {user} on doctype: {doctype} read: {frappe.has_permission(doctype, 'read', user=user)}, view: {frappe.has_permission(doctype, 'view', user=user)}, can_view_if_account_manager: {frappe.has_permission(doctype, 'can_view_if_account_manager', user=user)}")
@@ -17,59 +22,70 @@ import frappe
 #     return "1=1"
 
 
-RESTRICTED_ROLES = {
-    "Junior Sales - ALVOIP",
-    "Junior Sales - DMS",
-    "Junior Sales - AVTECH",
-    "Senior Sales - ALVOIP",
-    "Senior Sales - DMS",
-    "Senior Sales - AVTECH",
-}
-
 def is_restricted_user(user):
-    user_roles = set(frappe.get_roles(user))
-    return bool(user_roles & RESTRICTED_ROLES)
-
-def get_scope_condition(user, doctype):
     if user == "Administrator":
-        return "1=1"
+        return False
+
+    return get_user_context(user).has_class("restricted")
 
+# Restricted sales user — scope to their own records only
+@traced("Customer.scope")
+def get_customer_scope(user=None):
+    user = user or frappe.session.user
     if not is_restricted_user(user):
-        return "1=1"
+        return ""
 
-    # Restricted sales user — scope to their own records only
-    if doctype == "Customer":
-        return (
-            f"`tabCustomer`.account_manager = {frappe.db.escape(user)} "
-            f"OR `tabCustomer`.owner = {frappe.db.escape(user)}"
-        )
-    if doctype == "Quotation":
-        return f"`tabQuotation`.owner = {frappe.db.escape(user)}"
-    if doctype == "Sales Order":
-        return f"`tabSales Order`.owner = {frappe.db.escape(user)}"
+    return (
+        f"(`tabCustomer`.account_manager = {frappe.db.escape(user)} "
+        f"OR `tabCustomer`.owner = {frappe.db.escape(user)})"
+    )
 
-    return "1=1"
+@traced("Quotation.scope")
+def get_quotation_scope(user=None):
+    user = user or frappe.session.user
+    if not is_restricted_user(user):
+        return ""
 
+    return f"`tabQuotation`.owner = {frappe.db.escape(user)}"
 
-JUNIOR_ROLES = {"Junior Sales"}
-SENIOR_ROLES = {"Senior Sales"}
-TOP_ROLES = {"Sales Master Manager", "Sales Manager", "Product Manager", "CEO"}
-BLOCKED_ITEM_GROUP = "Professional Service"
+@traced("Sales Order.scope")
+def get_sales_order_scope(user=None):
+    user = user or frappe.session.user
+    if not is_restricted_user(user):
+        return ""
+
+    return f"`tabSales Order`.owner = {frappe.db.escape(user)}"
+
+def get_scope_condition(user, doctype):
+    """Dispatch to the registered scope function, doctypes outside SCOPE_REGISTRY are not scoped."""
+    method = SCOPE_REGISTRY.get(doctype)
+    if not method:
+        return ""
+
+    return frappe.get_attr(method)(user)
+
+
+BLOCKED_ITEM_GROUP = ", ".join(BLOCKED_ITEM_GROUPS)
 
 
 def validate_professional_service(doc, method):
-    user_roles = set(frappe.get_roles(frappe.session.user))
+    context = get_user_context()
+    if not context.has_class("junior"):
+        return
 
-    if not user_roles & JUNIOR_ROLES:
+    blocked_rows = get_blocked_rows(doc.items)
+    if not blocked_rows:
         return
 
-    for row in doc.items:
-        if row.item_group == BLOCKED_ITEM_GROUP:
-            frappe.throw(
-                f"Row {row.idx}: دورك ({', '.join(user_roles & JUNIOR_ROLES)}) "
-                f"لا يسمح بإضافة منتجات من مجموعة <b>{BLOCKED_ITEM_GROUP}</b>.",
-                title="Permission Denied"
-            )
+    rows = "<br>".join(
+        f"Row {row.idx}: {row.item_code} ({item_group})"
+        for row, item_group in blocked_rows
+    )
+    frappe.throw(
+        f"دورك ({', '.join(context.roles & JUNIOR_ROLES)}) "
+        f"لا يسمح بإضافة منتجات من مجموعة <b>{BLOCKED_ITEM_GROUP}</b>.<br><br>{rows}",
+        title="Permission Denied"
+    )
 
 
 # def check_approval_limit(doc, method):
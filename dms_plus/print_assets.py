@@ -0,0 +1,105 @@
+"""
+Static assets of the DMS print formats (header / footer images, GIFs, fonts).
+
+`get_print_asset(asset, company)` (also a jinja method, see hooks.py) returns
+the URL of the File for `asset`: the one attached to the Company if there is
+one, else the site-wide file with the same name. Lookups are cached in redis
+and cleared whenever a File changes.
+
+With `dms_plus_inline_print_assets` set in site config, or
+`frappe.local.dms_inline_print_assets` set for the current job (bulk_print,
+which has no session cookie to fetch /private/files with), the asset comes
+back as a base64 data URI instead, so wkhtmltopdf does not fetch it over
+HTTP. The encoded content is kept per worker.
+"""
+
+import base64
+import mimetypes
+
+import frappe
+
+PRINT_ASSETS_CACHE_KEY = "dms_plus:print_assets"
+PRINT_ASSETS_VERSION_KEY = "dms_plus:print_assets_version"
+
+# asset -> (file_name, url used when no File is found)
+ASSETS = {
+    "header": ("DMS-Header.jpg.png", "/private/files/DMS-Header.jpg.png"),
+    "footer": ("DMS-Footer.jpg", "/private/files/DMS-Footer.jpg"),
+    "font": ("IBM Plex Arabic SemiBold.otf", "/private/files/IBM Plex Arabic SemiBold.otf"),
+    "company_gif": ("company_gif.gif", "/files/company_gif.gif"),
+}
+
+ASSET_FILE_NAMES = {file_name for file_name, _ in ASSETS.values()}
+
+# (file name, version) -> data URI, per worker
+_inline_cache = {}
+
+
+def get_print_asset(asset, company=None, inline=None):
+    file_name, fallback_url = ASSETS[asset]
+
+    key = f"{company or ''}::{asset}"
+    cached = frappe.cache.hget(PRINT_ASSETS_CACHE_KEY, key)
+    if cached is None:
+        cached = find_file(file_name, company)
+        frappe.cache.hset(PRINT_ASSETS_CACHE_KEY, key, cached)
+        if not cached[0]:
+            # once per miss, later renders read the cached (None, None)
+            frappe.logger().warning(f"Print asset {asset} ({file_name}) not found, using {fallback_url}")
+
+    name, file_url = cached
+    if not name:
+        return fallback_url
+
+    if inline is None:
+        inline = getattr(frappe.local, "dms_inline_print_assets", False) or frappe.conf.get(
+            "dms_plus_inline_print_assets"
+        )
+
+    return get_data_uri(name, file_url) if inline else file_url
+
+
+def find_file(file_name, company=None):
+    """(File name, file_url) of the Company's attachment, else of any File with that name."""
+    filters = [{"file_name": file_name, "attached_to_doctype": "Company", "attached_to_name": company}] if company else []
+    filters.append({"file_name": file_name})
+
+    for file_filters in filters:
+        row = frappe.db.get_value("File", file_filters, ["name", "file_url"], order_by="creation desc")
+        if row:
+            return tuple(row)
+
+    return (None, None)
+
+
+def get_assets_version():
+    """PRINT_ASSETS_VERSION_KEY, read from redis once per request."""
+    if not hasattr(frappe.local, "dms_print_assets_version"):
+        frappe.local.dms_print_assets_version = frappe.cache.get_value(PRINT_ASSETS_VERSION_KEY)
+    return frappe.local.dms_print_assets_version
+
+
+def get_data_uri(name, file_url):
+    key = (name, get_assets_version())
+    if key not in _inline_cache:
+        content = frappe.get_doc("File", name).get_content()
+        if isinstance(content, str):
+            content = content.encode()
+        mimetype = mimetypes.guess_type(file_url)[0] or "application/octet-stream"
+        _inline_cache[key] = f"data:{mimetype};base64,{base64.b64encode(content).decode()}"
+
+    return _inline_cache[key]
+
+
+def clear_print_asset_cache(doc=None, method=None):
+    """File doc_events, every worker re-reads inlined assets after the version bump."""
+    if doc:
+        before = doc.get_doc_before_save()
+        names = {doc.file_name, before and before.file_name}
+        if not names & ASSET_FILE_NAMES:
+            return
+
+    frappe.cache.delete_value(PRINT_ASSETS_CACHE_KEY)
+    frappe.local.dms_print_assets_version = frappe.generate_hash(length=10)
+    frappe.cache.set_value(PRINT_ASSETS_VERSION_KEY, frappe.local.dms_print_assets_version)
+    _inline_cache.clear()
@@ -0,0 +1,126 @@
+"""
+Shared context for the DMS print formats.
+
+The templates used to look up the Company, its Dynamic Links and both
+Addresses with `frappe.get_doc` / `frappe.get_all` on every render. They now
+call `get_print_context(doc)` (registered as a jinja method in hooks.py) and
+only read plain values from it.
+
+Lookups are kept per request, so a bulk print resolves each company and
+customer once, and in redis until a Company or Address changes.
+"""
+
+import frappe
+from dms_plus.memo import clear_memo, get_local_cache, get_memoised, set_memoised
+
+PRINT_CONTEXT_CACHE_KEY = "dms_plus:print_context"
+PRINT_CONTEXT_LOCAL_ATTR = "dms_print_context"
+
+COMPANY_FIELDS = ("custom_company_registration", "tax_id")
+ADDRESS_FIELDS = ("address_line1", "address_line2", "city", "country", "pincode")
+
+
+def get_print_context(doc):
+    """
+    Returns:
+        frappe._dict: company (custom_company_registration, tax_id),
+        company_address and customer_address (address fields or None)
+    """
+    return frappe._dict(
+        company=get_company_details(doc.company),
+        company_address=get_linked_address("Company", doc.company),
+        customer_address=get_customer_address(doc),
+    )
+
+
+def get_customer_address(doc):
+    # the Customer ID first, then the display name the templates used to match on
+    for customer in dict.fromkeys((get_customer(doc), doc.get("customer_name"))):
+        address = get_linked_address("Customer", customer)
+        if address:
+            return address
+
+
+def get_customer(doc):
+    # Quotation
+    if doc.get("quotation_to"):
+        return doc.get("party_name") if doc.quotation_to == "Customer" else None
+    return doc.get("customer")
+
+
+def get_company_details(company):
+    def load():
+        company_doc = frappe.get_cached_doc("Company", company)
+        return {field: company_doc.get(field) for field in COMPANY_FIELDS}
+
+    return get_cached(f"company::{company}", load) if company else frappe._dict()
+
+
+def get_linked_address(link_doctype, link_name):
+    """Primary (else most recently changed) Address linked to the record, as a dict."""
+    if not link_name:
+        return None
+
+    def load():
+        rows = frappe.db.sql(f"""
+            SELECT {", ".join(f"a.{field}" for field in ADDRESS_FIELDS)}
+            FROM `tabDynamic Link` dl
+            JOIN `tabAddress` a ON a.name = dl.parent
+            WHERE dl.parenttype = 'Address'
+            AND dl.link_doctype = %s
+            AND dl.link_name = %s
+            ORDER BY a.is_primary_address DESC, dl.modified DESC
+            LIMIT 1
+        """, (link_doctype, link_name), as_dict=True)
+        return rows[0] if rows else None
+
+    return get_cached(f"address::{link_doctype}::{link_name}", load)
+
+
+def prime_print_context(docs):
+    """
+    Resolve the context of many documents up front (bulk print): each company
+    once, and every customer address in a single query.
+    """
+    customers = set()
+    for doc in docs:
+        if doc.get("company"):
+            get_company_details(doc.company)
+        customers.update(c for c in (get_customer(doc), doc.get("customer_name")) if c)
+
+    local_cache = get_local_cache(PRINT_CONTEXT_LOCAL_ATTR)
+    missing = [c for c in customers if f"address::Customer::{c}" not in local_cache]
+    if not missing:
+        return
+
+    addresses = {}
+    for row in frappe.db.sql(f"""
+        SELECT dl.link_name, {", ".join(f"a.{field}" for field in ADDRESS_FIELDS)}
+        FROM `tabDynamic Link` dl
+        JOIN `tabAddress` a ON a.name = dl.parent
+        WHERE dl.parenttype = 'Address'
+        AND dl.link_doctype = 'Customer'
+        AND dl.link_name IN %s
+        ORDER BY a.is_primary_address DESC, dl.modified DESC
+    """, (tuple(missing),), as_dict=True):
+        # rows come best first, keep the first one per customer
+        addresses.setdefault(row.pop("link_name"), row)
+
+    for customer in missing:
+        set_memoised(
+            PRINT_CONTEXT_CACHE_KEY, PRINT_CONTEXT_LOCAL_ATTR, f"address::Customer::{customer}",
+            addresses.get(customer), wrap=to_dict,
+        )
+
+
+def get_cached(key, load):
+    return get_memoised(PRINT_CONTEXT_CACHE_KEY, PRINT_CONTEXT_LOCAL_ATTR, key, load, wrap=to_dict)
+
+
+def to_dict(value):
+    return frappe._dict(value) if value else value
+
+
+def clear_print_context_cache(doc=None, method=None):
+    """Company and Address doc_events"""
+    clear_memo(PRINT_CONTEXT_CACHE_KEY, PRINT_CONTEXT_LOCAL_ATTR)
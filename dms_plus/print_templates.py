@@ -0,0 +1,223 @@
+"""
+Shared templates of the DMS print formats.
+
+The six DMS formats (Quotation, Tax Invoice, Proforma Invoice, each in
+English and Arabic) are one layout, templates/print_formats/dms/base.html,
+extended per doctype by quotation.html and sales_invoice.html. The print
+format HTML is only a call to the jinja method:
+
+    {{ render_dms_print(doc, "tax_invoice", "ar") }}
+
+Frappe builds its jinja environment per request, so the compiled templates
+are kept in an environment of our own that lives as long as the worker, and
+the bytecode is also written to sites/.dms_template_cache so a fresh worker
+skips the parse. Templates are compiled on the first render of a worker;
+`warm_up` runs after migrate (see hooks.py) to fill the bytecode cache.
+"""
+
+import os
+
+import frappe
+from jinja2 import DebugUndefined, FileSystemBytecodeCache, FileSystemLoader
+from jinja2.sandbox import SandboxedEnvironment
+from markupsafe import Markup
+
+BYTECODE_FOLDER = ".dms_template_cache"
+
+# kind -> template under templates/print_formats/dms/
+TEMPLATES = {
+    "quotation": "quotation.html",
+    "tax_invoice": "sales_invoice.html",
+    "proforma_invoice": "sales_invoice.html",
+}
+
+# the wording of each format is kept as it was before the formats were merged,
+# they are legal documents. LABELS holds the invoice wording, KIND_LABELS
+# what a kind prints differently
+LABELS = {
+    "en": {
+        "supplier": "SELLER",
+        "customer": "CUSTOMER",
+        "company_name": "Company Name",
+        "cr": "C.R",
+        "tax_id": "VAT NO",
+        "company_cr_empty": " No C.R No.",
+        "company_tax_id_empty": " No Tax No.",
+        "customer_name_empty": "-",
+        "customer_cr_empty": "-",
+        "customer_tax_id_empty": "-",
+        "no_address": "National Address: -",
+        "address": "Address",
+        "company_address_title": "National Address",
+        "company_city": "City",
+        "company_country": "Country",
+        "company_postal_code": "Postal Code",
+        "customer_address_title": "National Address",
+        "customer_city": "City",
+        "customer_country": "country",
+        "customer_postal_code": "Postal Code ",
+        "quotation_number": "Quotation Number",
+        "quotation_date": "Quotation Date",
+        "invoice_number": "Invoice No.",
+        "posting_date": "Posting Date",
+        "po_no": "Purchase Order",
+        "po_date": "Purchase Order Date",
+        "item_name": "Item Name",
+        "description": "Description",
+        "qty": "Quantity",
+        "rate": "Rate",
+        "discount_percentage": "Discount %",
+        "discount_amount": "Discount Amount",
+        "amount": "Total",
+        "total": "Total Before Tax",
+        "additional_discount": "Additional Discount Amount",
+        "net_total": "Total After Discount",
+        "tax_rate": "Tax Rate %",
+        "tax_amount": "Tax Amount",
+        "grand_total": "Total After Tax",
+        "in_words": "In Words",
+    },
+    "ar": {
+        "supplier": "المورد",
+        "customer": "العميل",
+        "company_name": "اسم الشركة",
+        "cr": "السجل التجاري",
+        "tax_id": "الرقم الضريبي",
+        "company_cr_empty": "-",
+        "company_tax_id_empty": "-",
+        "customer_name_empty": " ",
+        "customer_cr_empty": " ",
+        "customer_tax_id_empty": "No VAT No",
+        "no_address": "العنوان الوطني : -",
+        "address": "العنوان",
+        "company_address_title": "العنوان الوطني",
+        "company_city": "المدينه",
+        "company_country": "الدولة",
+        "company_postal_code": "الرقم البريدي",
+        "customer_address_title": "العنوان الوطني",
+        "customer_city": "المدينه",
+        "customer_country": "الدولة",
+        "customer_postal_code": "الرقم البريدي",
+        "quotation_number": "رقم عرض السعر",
+        "quotation_date": "تاريخ عرض السعر",
+        "invoice_number": "رقم الفاتورة",
+        "posting_date": "تاريخ الفاتورة",
+        "po_no": " رقم طلب الشراء",
+        "po_date": "تاريخ طلب الشراء",
+        "item_name": "اسم الصنف",
+        "description": "الوصف",
+        "qty": "الكمية",
+        "rate": "سعر الوحدة",
+        "discount_percentage": "نسبة الخصم",
+        "discount_amount": "قيمة الخصم",
+        "amount": "الأجمالي",
+        "total": " اجمالى المبلغ قبل الضريبة",
+        "additional_discount": " مبلغ الخصم الاضافي",
+        "net_total": " الاجمالى بعد الخصم ",
+        "tax_rate": "نسبة الضريبة",
+        "tax_amount": "قيمة الضريبة",
+        "grand_total": " الاجمالى بعد الضريبة",
+        "in_words": "المبلغ كتابياً",
+    },
+}
+
+KIND_LABELS = {
+    "quotation": {
+        "en": {
+            "title": "Quotation",
+            "supplier": "Supplier",
+            "customer": "Customer",
+            "tax_id": "Tax ID",
+            "company_cr_empty": "No C.R",
+            "company_tax_id_empty": "-",
+            "customer_name_empty": " ",
+            "customer_cr_empty": "No C.R",
+            "customer_tax_id_empty": "No VAT No",
+            "total": "Subtotal",
+            "additional_discount": "Additional Discount",
+            "net_total": "Net Total",
+            "grand_total": "Grand Total",
+            "in_words": "Total in Words",
+        },
+        "ar": {
+            "title": "عرض سعر",
+            "customer_tax_id_empty": "No VAT Num.",
+            "company_city": "المدينة",
+            "customer_city": "المدينة",
+            "amount": "الإجمالي",
+            "total": "الإجمالي قبل الضريبة",
+            "additional_discount": "قيمة الخصم الإضافي",
+            "net_total": "الإجمالي بعد الخصم",
+            "tax_rate": "نسبة الضريبة %",
+            "grand_total": "الإجمالي بعد الضريبة",
+            "in_words": "المبلغ كتابة",
+        },
+    },
+    "tax_invoice": {
+        "en": {"title": "TAX INVOICE"},
+        "ar": {"title": "فاتورة ضريبية", "customer_address_title": "National Address"},
+    },
+    "proforma_invoice": {
+        "en": {"title": "PROFORMA INVOICE"},
+        "ar": {"title": "فاتورة أولية"},
+    },
+}
+
+_environment = None
+
+
+def get_labels(kind, locale):
+    return {**LABELS[locale], **KIND_LABELS[kind][locale]}
+
+
+def get_environment():
+    """Per worker environment, frappe.get_jenv() is rebuilt on every request."""
+    global _environment
+    if _environment is None:
+        _environment = SandboxedEnvironment(
+            loader=FileSystemLoader(frappe.get_app_path("dms_plus", "templates")),
+            bytecode_cache=get_bytecode_cache(),
+            # same as frappe.get_jenv(), a missing field renders as before
+            undefined=DebugUndefined,
+            # re-read the files on change only while developing
+            auto_reload=bool(frappe.conf.developer_mode),
+            cache_size=-1,
+        )
+        _environment.filters.update(frappe.get_jenv().filters)
+
+    return _environment
+
+
+def get_bytecode_cache():
+    """None (compile in memory only) when the sites folder is not writable."""
+    bytecode_path = os.path.join(frappe.local.sites_path, BYTECODE_FOLDER)
+    try:
+        os.makedirs(bytecode_path, exist_ok=True)
+    except OSError:
+        frappe.logger().warning(f"DMS print templates: cannot create {bytecode_path}, bytecode cache disabled")
+        return None
+    return FileSystemBytecodeCache(bytecode_path)
+
+
+def get_template(kind):
+    return get_environment().get_template(f"print_formats/dms/{TEMPLATES[kind]}")
+
+
+def render_dms_print(doc, kind, locale="en"):
+    """Jinja method, the whole body of a DMS print format."""
+    return Markup(get_template(kind).render(
+        frappe.get_jenv().globals,
+        doc=doc,
+        kind=kind,
+        locale=locale,
+        labels=get_labels(kind, locale),
+    ))
+
+
+def warm_up():
+    """after_migrate: compile every template, a failure is logged and never stops the migrate."""
+    try:
+        for kind in TEMPLATES:
+            get_template(kind)
+    except Exception:
+        frappe.log_error(title="DMS print templates: warm up failed")
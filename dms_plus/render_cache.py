@@ -0,0 +1,214 @@
+"""
+On-disk cache of the rendered HTML and PDF of submitted documents.
+
+A submitted Quotation / Sales Invoice does not change, so reprints, portal
+downloads and repeated emails can reuse the first render. Only the DMS print
+formats in DMS_PRINT_FORMATS are cached: they print the same fields for every
+user, while frappe's standard format hides permlevel fields per user. Any
+other doctype or format goes to frappe as before.
+
+Entries are keyed by everything that changes the output:
+
+    (doctype, name, modified, print format + its modified, letterhead +
+     its modified, no_letterhead, Print Settings modified, language,
+     dms_plus version, print assets version, producer)
+
+`producer` tells apart output made differently: frappe.get_print here,
+bulk_print's inlined assets and own wkhtmltopdf options in the bulk job.
+
+and stored under sites/<site>/private/dms_render_cache/. Reads bump the
+file's mtime. Every EVICT_EVERY writes of a worker, and hourly from the
+scheduler, the least recently used files are removed until the folder fits
+in `dms_plus_render_cache_mb` (site config, default DEFAULT_SIZE_MB).
+
+`download_pdf` replaces frappe's whitelisted method of the same name (see
+override_whitelisted_methods in hooks.py) and falls through to it for
+drafts and cancelled documents.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import frappe
+from frappe.utils import cint
+from frappe.utils.print_format import download_pdf as frappe_download_pdf
+from frappe.www.printview import validate_print_permission
+
+import dms_plus
+from dms_plus.print_assets import get_assets_version
+
+CACHE_FOLDER = "dms_render_cache"
+DEFAULT_SIZE_MB = 500
+EVICT_EVERY = 50
+GET_PRINT = "get_print"
+
+# doctype -> print formats whose output is cached
+DMS_PRINT_FORMATS = {
+    "Quotation": frozenset({"Quotation - DMS", "عرض سعر - DMS"}),
+    "Sales Invoice": frozenset({
+        "Tax Invoice-DMS", "فاتورة ضريبية-DMS",
+        "Proforma Invoice-DMS", "فاتورة أولية -DMS",
+    }),
+}
+
+# writes since the last eviction, per worker
+_writes = 0
+
+
+def get_cache_path(*parts):
+    return frappe.get_site_path("private", CACHE_FOLDER, *parts)
+
+
+def get_cache_key(doc, print_format=None, letterhead=None, no_letterhead=0, lang=None, producer=GET_PRINT):
+    """None when the document is not submitted or the format is not a DMS one, only those are cached."""
+    if doc.docstatus != 1 or doc.doctype not in DMS_PRINT_FORMATS:
+        return None
+
+    # the defaults frappe falls back to, so changing them is a new key too
+    print_format = print_format or frappe.get_meta(doc.doctype).default_print_format or "Standard"
+    if print_format not in DMS_PRINT_FORMATS[doc.doctype]:
+        return None
+
+    if not cint(no_letterhead):
+        letterhead = letterhead or frappe.db.get_value("Letter Head", {"is_default": 1})
+
+    parts = [
+        doc.doctype,
+        doc.name,
+        str(doc.modified),
+        print_format,
+        print_format and str(frappe.get_cached_value("Print Format", print_format, "modified")),
+        letterhead,
+        letterhead and str(frappe.get_cached_value("Letter Head", letterhead, "modified")),
+        cint(no_letterhead),
+        str(frappe.db.get_single_value("Print Settings", "modified")),
+        lang or frappe.local.lang,
+        dms_plus.__version__,
+        get_assets_version(),
+        producer,
+    ]
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def get(key, extension):
+    if not key:
+        return None
+
+    path = get_cache_path(f"{key}.{extension}")
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+
+    # LRU: the mtime is the last use
+    os.utime(path)
+    return content
+
+
+def put(key, extension, content):
+    global _writes
+    if not key or content is None:
+        return
+
+    if isinstance(content, str):
+        content = content.encode()
+
+    folder = get_cache_path()
+    os.makedirs(folder, exist_ok=True)
+
+    # write then rename, readers never see half a file
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, os.path.join(folder, f"{key}.{extension}"))
+
+    # scanning the folder on every write is too much, see also the hourly job
+    _writes += 1
+    if _writes >= EVICT_EVERY:
+        _writes = 0
+        evict()
+
+
+def evict(max_bytes=None):
+    """Remove the least recently used entries until the folder fits the size cap."""
+    if max_bytes is None:
+        max_bytes = (cint(frappe.conf.get("dms_plus_render_cache_mb")) or DEFAULT_SIZE_MB) * 1024 * 1024
+
+    folder = get_cache_path()
+    try:
+        entries = [entry for entry in os.scandir(folder) if entry.is_file()]
+    except FileNotFoundError:
+        return
+
+    stats = [(entry.path, entry.stat()) for entry in entries]
+    total = sum(stat.st_size for _, stat in stats)
+    if total <= max_bytes:
+        return
+
+    for path, stat in sorted(stats, key=lambda s: s[1].st_mtime):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= stat.st_size
+        if total <= max_bytes:
+            break
+
+
+def clear_render_cache():
+    """
+    Usage: bench --site <site> execute dms_plus.render_cache.clear_render_cache
+    """
+    evict(max_bytes=0)
+
+
+def get_html(doc, print_format=None, letterhead=None, no_letterhead=0, lang=None, producer=GET_PRINT):
+    key = get_cache_key(doc, print_format, letterhead, no_letterhead, lang, producer)
+    html = get(key, "html")
+    if html is not None:
+        return html.decode()
+
+    html = frappe.get_print(
+        doc.doctype, doc.name, print_format, doc=doc, letterhead=letterhead, no_letterhead=no_letterhead
+    )
+    put(key, "html", html)
+    return html
+
+
+def get_pdf(doc, print_format=None, letterhead=None, no_letterhead=0, lang=None):
+    key = get_cache_key(doc, print_format, letterhead, no_letterhead, lang)
+    pdf = get(key, "pdf")
+    if pdf is not None:
+        return pdf
+
+    pdf = frappe.get_print(
+        doc.doctype, doc.name, print_format, doc=doc, as_pdf=True, letterhead=letterhead, no_letterhead=no_letterhead
+    )
+    put(key, "pdf", pdf)
+    return pdf
+
+
+@frappe.whitelist(allow_guest=True)
+def download_pdf(doctype, name, format=None, doc=None, no_letterhead=0, language=None, letterhead=None):
+    """Cached `frappe.utils.print_format.download_pdf` for submitted documents in a DMS format."""
+    if doc:
+        return frappe_download_pdf(doctype, name, format=format, doc=doc, no_letterhead=no_letterhead,
+                                   language=language, letterhead=letterhead)
+
+    doc = frappe.get_doc(doctype, name)
+    if not get_cache_key(doc, format, letterhead, no_letterhead, language):
+        return frappe_download_pdf(doctype, name, format=format, no_letterhead=no_letterhead,
+                                   language=language, letterhead=letterhead)
+
+    # frappe.get_print checks this when rendering, a cache hit must check it too
+    validate_print_permission(doc)
+
+    if language:
+        frappe.local.lang = language
+
+    frappe.local.response.filename = "{name}.pdf".format(name=name.replace(" ", "-").replace("/", "-"))
+    frappe.local.response.filecontent = get_pdf(doc, format, letterhead, no_letterhead, language)
+    frappe.local.response.type = "pdf"
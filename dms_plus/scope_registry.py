@@ -0,0 +1,14 @@
+"""
+Doctypes whose list queries are scoped for restricted sales users, mapped to
+the function that builds their condition.
+
+hooks.py generates `permission_query_conditions` from this dict, so list
+views, reports and link searches on any other doctype never call into
+dms_plus. Keep this module free of frappe imports, it is loaded with hooks.
+"""
+
+SCOPE_REGISTRY = {
+    "Customer": "dms_plus.permissions.get_customer_scope",
+    "Quotation": "dms_plus.permissions.get_quotation_scope",
+    "Sales Order": "dms_plus.permissions.get_sales_order_scope",
+}
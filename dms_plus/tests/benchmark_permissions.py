@@ -0,0 +1,333 @@
+# Permission hook benchmark against a synthetic org
+# not collected by the test runner (no test_ prefix), run it on a dev / test site:
+#
+#   bench --site <site> execute dms_plus.tests.benchmark_permissions.run
+#   bench --site <site> execute dms_plus.tests.benchmark_permissions.run --kwargs "{'depth': 5, 'breadth': 4, 'customers': 50000}"
+#   bench --site <site> execute dms_plus.tests.benchmark_permissions.compare --kwargs "{'base': '<old.json>', 'head': '<new.json>'}"
+#
+# The org is inserted inside one transaction and rolled back at the end
+# (pass keep=True to commit it), so the site is left as it was.
+
+import json
+import os
+import random
+import subprocess
+import time
+
+import frappe
+from frappe.utils import now, nowdate
+
+from dms_plus.crm_permissions import customer_permissions, quotation_permissions, sales_order_permissions
+from dms_plus.crm_permissions.cache import clear_permission_cache
+from dms_plus.crm_permissions.tracing import count_queries, percentile
+from dms_plus.crm_permissions.utils import get_team_hierarchy
+from dms_plus.dms_plus.doctype.dms_employee_closure.dms_employee_closure import CLOSURE_DOCTYPE, get_row_name
+from dms_plus import permissions
+
+PREFIX = "_Bench"
+
+# role per level of the tree, the last one is used for every deeper level
+LEVEL_ROLES = [
+    ["Sales Master Manager - Network"],
+    ["Sales Manager - Network"],
+    ["Sales Coordinator - Network DEPT", "Product MGR - Network"],
+    ["Senior Sales - Network DEPT", "Junior Sales - Network DEPT"],
+]
+LEVEL_ROLES_FLAT = {role for roles in LEVEL_ROLES for role in roles}
+
+# users outside the Network tree
+OTHER_ROLES = ["CEO", "Senior Sales - DMS", "Junior Sales - DMS", "Sales User"]
+
+CONDITION_BUILDERS = {
+    "Customer": (customer_permissions.get_permission_query_conditions, permissions.get_customer_scope),
+    "Quotation": (quotation_permissions.get_permission_query_conditions, permissions.get_quotation_scope),
+    "Sales Order": (sales_order_permissions.get_permission_query_conditions, permissions.get_sales_order_scope),
+}
+
+
+def run(
+    depth=4,
+    breadth=4,
+    customers=20000,
+    quotations=20000,
+    sales_orders=20000,
+    iterations=30,
+    users_per_role=3,
+    output=None,
+    keep=False,
+    seed=42,
+):
+    """Build the org, time every permission entry point and write the results as JSON."""
+    random.seed(seed)
+    params = {
+        "depth": depth, "breadth": breadth, "customers": customers, "quotations": quotations,
+        "sales_orders": sales_orders, "iterations": iterations, "users_per_role": users_per_role, "seed": seed,
+    }
+
+    start = time.perf_counter()
+    org = build_org(depth, breadth, customers, quotations, sales_orders)
+    print(f"Synthetic org built in {time.perf_counter() - start:.1f}s: "
+          f"{len(org['employees'])} employees, {customers} customers, {quotations} quotations, {sales_orders} sales orders")
+
+    try:
+        results = run_benchmarks(org, iterations, users_per_role)
+    finally:
+        frappe.set_user("Administrator")
+        if keep:
+            frappe.db.commit()
+        else:
+            frappe.db.rollback()
+        clear_bench_caches(org)
+
+    report = {
+        "commit": get_commit(),
+        "at": now(),
+        "params": params,
+        "results": results,
+    }
+
+    output = output or frappe.get_site_path("dms_plus_benchmarks", f"permissions-{int(time.time())}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+
+    print_results(results)
+    print(f"Results written to {output}")
+    return output
+
+
+# ========== Synthetic org ==========
+def build_org(depth, breadth, customers, quotations, sales_orders):
+    company = frappe.defaults.get_global_default("company")
+    timestamp = now()
+    base = {"creation": timestamp, "modified": timestamp, "owner": "Administrator", "modified_by": "Administrator"}
+
+    # employees: breadth ** level nodes per level
+    employees, parent_of, role_of = [], {}, {}
+    level_nodes = [None]
+    for level in range(depth + 1):
+        roles = LEVEL_ROLES[min(level, len(LEVEL_ROLES) - 1)]
+        next_nodes = []
+        for parent in level_nodes:
+            for i in range(1 if parent is None else breadth):
+                name = f"{PREFIX}-EMP-{len(employees):05d}"
+                employees.append(name)
+                parent_of[name] = parent
+                role_of[name] = roles[i % len(roles)]
+                next_nodes.append(name)
+        level_nodes = next_nodes
+
+    others = [f"{PREFIX}-EMP-X{i:02d}" for i in range(len(OTHER_ROLES))]
+    for name, role in zip(others, OTHER_ROLES):
+        employees.append(name)
+        parent_of[name] = None
+        role_of[name] = role
+
+    user_of = {emp: f"{emp.lower()}@bench.example.com" for emp in employees}
+    sales_person_of = {emp: f"{emp}-SP" for emp in employees}
+    users = list(user_of.values())
+
+    insert("User", [
+        dict(base, name=user, email=user, first_name=emp, enabled=1, user_type="System User",
+             dms_network_user=int(role_of[emp] in LEVEL_ROLES_FLAT))
+        for emp, user in user_of.items()
+    ])
+    insert("Has Role", [
+        dict(base, name=f"{user}-role", parent=user, parenttype="User", parentfield="roles", role=role_of[emp])
+        for emp, user in user_of.items()
+    ])
+    insert("Employee", [
+        dict(base, name=emp, employee_name=emp, first_name=emp, user_id=user_of[emp],
+             reports_to=parent_of[emp], company=company, status="Active")
+        for emp in employees
+    ])
+    insert("Sales Person", [
+        dict(base, name=sales_person_of[emp], sales_person_name=sales_person_of[emp], employee=emp, enabled=1)
+        for emp in employees
+    ])
+    insert(CLOSURE_DOCTYPE, [
+        dict(base, name=get_row_name(ancestor, emp), ancestor=ancestor, descendant=emp, depth=d)
+        for emp in employees
+        for d, ancestor in enumerate(get_ancestors(emp, parent_of))
+    ])
+
+    customer_names = [f"{PREFIX}-CUST-{i:06d}" for i in range(customers)]
+    customer_owner = {name: random.choice(users) for name in customer_names}
+    insert("Customer", [
+        dict(base, name=name, customer_name=name, owner=customer_owner[name], customer_type="Company")
+        for name in customer_names
+    ])
+    insert("Sales Team", [
+        dict(base, name=f"{name}-st", parent=name, parenttype="Customer", parentfield="sales_team",
+             sales_person=random.choice(list(sales_person_of.values())), allocated_percentage=100)
+        for name in customer_names
+    ])
+
+    has_account_manager = frappe.db.has_column("Quotation", "account_manager")
+    quotation_rows = []
+    for i in range(quotations):
+        row = dict(base, name=f"{PREFIX}-QTN-{i:06d}", owner=random.choice(users), quotation_to="Customer",
+                   party_name=random.choice(customer_names), transaction_date=nowdate(), company=company,
+                   docstatus=random.choice((0, 1)), status="Open")
+        if has_account_manager:
+            row["account_manager"] = random.choice(employees)
+        quotation_rows.append(row)
+    insert("Quotation", quotation_rows)
+
+    insert("Sales Order", [
+        dict(base, name=f"{PREFIX}-SO-{i:06d}", owner=random.choice(users), customer=random.choice(customer_names),
+             transaction_date=nowdate(), company=company, docstatus=random.choice((0, 1)), status="To Deliver and Bill")
+        for i in range(sales_orders)
+    ])
+
+    return {
+        "employees": employees,
+        "users": users,
+        "role_of_user": {user_of[emp]: role_of[emp] for emp in employees},
+        "customers": customer_names,
+        "quotations": [row["name"] for row in quotation_rows],
+    }
+
+
+
+def get_ancestors(employee, parent_of):
+    node = employee
+    while node:
+        yield node
+        node = parent_of.get(node)
+
+
+def insert(doctype, rows):
+    if not rows:
+        return
+    fields = list(rows[0])
+    frappe.db.bulk_insert(doctype, fields, [tuple(row[f] for f in fields) for row in rows])
+
+
+def clear_bench_caches(org):
+    clear_permission_cache()
+    for user in org["users"]:
+        frappe.cache.hdel("roles", user)
+
+
+# ========== Benchmarks ==========
+def run_benchmarks(org, iterations, users_per_role):
+    by_role = {}
+    for user, role in org["role_of_user"].items():
+        by_role.setdefault(role, []).append(user)
+    sample_users = {role: users[:users_per_role] for role, users in by_role.items()}
+
+    results = {}
+    for role, users in sample_users.items():
+        role_results = results[role] = {}
+        for user in users:
+            bench(role_results, "get_team_hierarchy", iterations, lambda: get_team_hierarchy(user))
+
+            for doctype, (builder, scope) in CONDITION_BUILDERS.items():
+                bench(role_results, f"{doctype}.conditions (cold)", iterations,
+                      lambda: builder(user=user), before=clear_permission_cache)
+                bench(role_results, f"{doctype}.conditions (warm)", iterations, lambda: builder(user=user))
+                bench(role_results, f"{doctype}.scope", iterations, lambda: scope(user=user))
+
+            quotations = frappe.get_all(
+                "Quotation", filters={"name": ["in", random.sample(org["quotations"], min(iterations, len(org["quotations"])))]},
+                fields=["name", "owner", "account_manager"] if frappe.db.has_column("Quotation", "account_manager") else ["name", "owner"],
+            )
+            docs = iter(quotations)
+            bench(role_results, "Quotation.has_permission", len(quotations),
+                  lambda: quotation_permissions.has_permission(next(docs), ptype="read", user=user),
+                  before=reset_request_memos)
+
+            customers = [frappe.get_doc("Customer", name) for name in random.sample(org["customers"], min(iterations, len(org["customers"])))]
+            docs = iter(customers)
+            bench(role_results, "Customer.has_permission", len(customers),
+                  lambda: customer_permissions.customer_sales_permission(next(docs), "read", user),
+                  before=reset_request_memos)
+
+            frappe.set_user(user)
+            for doctype in CONDITION_BUILDERS:
+                bench(role_results, f"{doctype}.get_list", iterations,
+                      lambda: frappe.get_list(doctype, fields=["name"], limit_page_length=20, order_by="modified desc"),
+                      before=clear_permission_cache)
+            frappe.set_user("Administrator")
+
+    return {role: summarize(timings) for role, timings in results.items()}
+
+
+def reset_request_memos():
+    frappe.local.dms_quotation_owner_teams = {}
+    frappe.local.dms_user_contexts = {}
+
+
+def bench(results, name, iterations, fn, before=None):
+    timings = results.setdefault(name, [])
+    for _ in range(iterations):
+        if before:
+            before()
+
+        counter, restore = count_queries()
+        start = time.perf_counter()
+        try:
+            fn()
+        finally:
+            elapsed = time.perf_counter() - start
+            restore()
+
+        timings.append((elapsed * 1000, counter[0]))
+
+
+def summarize(timings):
+    summary = {}
+    for name, samples in timings.items():
+        ms = sorted(s[0] for s in samples)
+        summary[name] = {
+            "calls": len(samples),
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "max_ms": round(ms[-1], 3),
+            "avg_queries": round(sum(s[1] for s in samples) / len(samples), 2),
+        }
+    return summary
+
+
+def print_results(results):
+    for role, summary in results.items():
+        print(f"\n{role}")
+        for name, s in sorted(summary.items()):
+            print(f"  {name:<35} p50={s['p50_ms']:>9.3f}ms p95={s['p95_ms']:>9.3f}ms queries={s['avg_queries']}")
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=frappe.get_app_path("dms_plus"),
+            text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+# ========== Comparing runs ==========
+def compare(base, head, threshold=1.2):
+    """Print every measurement whose p95 grew by more than `threshold` between two result files."""
+    with open(base) as f:
+        base = json.load(f)
+    with open(head) as f:
+        head = json.load(f)
+
+    regressions = []
+    for role, summary in head["results"].items():
+        for name, s in summary.items():
+            old = base["results"].get(role, {}).get(name)
+            if not old or not old["p95_ms"]:
+                continue
+
+            ratio = s["p95_ms"] / old["p95_ms"]
+            if ratio > threshold or s["avg_queries"] > old["avg_queries"]:
+                regressions.append((role, name, old, s, ratio))
+                print(f"[REGRESSION] {role} / {name}: p95 {old['p95_ms']}ms -> {s['p95_ms']}ms (x{ratio:.2f}), "
+                      f"queries {old['avg_queries']} -> {s['avg_queries']}")
+
+    print(f"{base['commit']} -> {head['commit']}: {len(regressions)} regression(s)")
+    return len(regressions)
@@ -0,0 +1,49 @@
+# Employee closure table
+# A -> B -> C  (C reports to B, B reports to A)
+# moving C under A must drop the B -> C link and keep A -> C
+
+import frappe
+import unittest
+from dms_plus.dms_plus.doctype.dms_employee_closure.dms_employee_closure import (
+    CLOSURE_DOCTYPE,
+    get_row_name,
+    move_subtree,
+    on_employee_rename,
+)
+
+
+def get_links(employee):
+    return set(frappe.get_all(
+        CLOSURE_DOCTYPE,
+        filters={"descendant": employee},
+        pluck="ancestor"
+    ))
+
+
+class TestEmployeeClosure(unittest.TestCase):
+
+    def setUp(self):
+        self.a, self.b, self.c = "_Test Closure A", "_Test Closure B", "_Test Closure C"
+        self.renamed = "_Test Closure B2"
+        move_subtree(self.a, None)
+        move_subtree(self.b, self.a)
+        move_subtree(self.c, self.b)
+
+    def tearDown(self):
+        frappe.db.delete(CLOSURE_DOCTYPE, {"descendant": ["in", [self.a, self.b, self.c, self.renamed]]})
+
+    def test_chain(self):
+        self.assertEqual(get_links(self.c), {self.a, self.b, self.c})
+
+    def test_move_subtree(self):
+        move_subtree(self.b, None)
+        self.assertEqual(get_links(self.c), {self.b, self.c})
+
+        move_subtree(self.c, self.a)
+        self.assertEqual(get_links(self.c), {self.a, self.c})
+
+    def test_rename(self):
+        on_employee_rename(None, old_name=self.b, new_name=self.renamed)
+        self.assertEqual(get_links(self.c), {self.a, self.renamed, self.c})
+        self.assertEqual(get_links(self.renamed), {self.a, self.renamed})
+        self.assertTrue(frappe.db.exists(CLOSURE_DOCTYPE, get_row_name(self.renamed, self.c)))
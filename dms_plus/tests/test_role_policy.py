@@ -0,0 +1,112 @@
+# Role policy table
+# every rule of crm_permissions/policy.py must decide exactly what the role
+# checks it replaced did, for each role on its own and for every pair of roles
+
+import itertools
+import unittest
+
+from dms_plus.crm_permissions.policy import CLASS_BITS, RULES, ROLE_CLASSES, CompiledPolicy
+
+MANAGER = "Sales Manager - Network"
+MASTER = "Sales Master Manager - Network"
+PRODUCT = "Product MGR - Network"
+COORDINATOR = "Sales Coordinator - Network DEPT"
+SENIOR = "Senior Sales - Network DEPT"
+JUNIOR = "Junior Sales - Network DEPT"
+NETWORK = {MANAGER, MASTER, PRODUCT, COORDINATOR, SENIOR, JUNIOR}
+
+
+# ========== the checks before the policy, as decisions ==========
+def old_customer_scope(roles):
+    if "CEO" not in roles and not roles & NETWORK:
+        return "non_network"
+    if "CEO" in roles:
+        return "all"
+    if roles & {COORDINATOR, MANAGER, MASTER}:
+        return "team"
+    if roles & {JUNIOR, SENIOR}:
+        return "own_sales_person"
+    return None
+
+
+def old_order_scope(roles):
+    if "CEO" not in roles and not roles & NETWORK:
+        return "non_network"
+    if roles & {"Administrator", "CEO"}:
+        return "all"
+    if roles & {MANAGER, PRODUCT, MASTER}:
+        return "team"
+    if roles & {JUNIOR, SENIOR, COORDINATOR}:
+        return "own"
+    return None
+
+
+def old_customer_access(roles):
+    if roles & {"CEO", MANAGER, MASTER}:
+        return "full"
+    if roles & {JUNIOR, SENIOR}:
+        return "sales_team"
+    return None
+
+
+def old_quotation_access(roles):
+    if "CEO" in roles:
+        return "full"
+    if roles & {MANAGER, PRODUCT, COORDINATOR, MASTER}:
+        return "team"
+    return None
+
+
+OLD_RULES = {
+    "customer_scope": old_customer_scope,
+    "order_scope": old_order_scope,
+    "customer_access": old_customer_access,
+    "quotation_access": old_quotation_access,
+}
+
+# one role per line: customer_scope, order_scope, customer_access, quotation_access
+EXPECTED = {
+    "CEO": ("all", "all", "full", "full"),
+    MASTER: ("team", "team", "full", "team"),
+    MANAGER: ("team", "team", "full", "team"),
+    PRODUCT: (None, "team", None, "team"),
+    COORDINATOR: ("team", "own", None, "team"),
+    SENIOR: ("own_sales_person", "own", "sales_team", None),
+    JUNIOR: ("own_sales_person", "own", "sales_team", None),
+    "Senior Sales - DMS": ("non_network", "non_network", None, None),
+    "Junior Sales - DMS": ("non_network", "non_network", None, None),
+    "Junior Sales": ("non_network", "non_network", None, None),
+    "Sales User": ("non_network", "non_network", None, None),
+}
+
+
+def get_policy():
+    """Compiled as on a site where every role is enabled, without the database"""
+    role_bits = {}
+    for name, roles in ROLE_CLASSES.items():
+        for role in roles:
+            role_bits[role] = role_bits.get(role, 0) | CLASS_BITS[name]
+    return CompiledPolicy(None, role_bits, {rule: {} for rule in RULES})
+
+
+class TestRolePolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = get_policy()
+
+    def decide(self, rule, roles):
+        return self.policy.decide(rule, self.policy.get_mask(roles))
+
+    def test_single_roles(self):
+        for role, expected in EXPECTED.items():
+            for rule, decision in zip(OLD_RULES, expected):
+                with self.subTest(role=role, rule=rule):
+                    self.assertEqual(self.decide(rule, {role}), decision)
+                    self.assertEqual(OLD_RULES[rule]({role}), decision)
+
+    def test_role_pairs_match_old_checks(self):
+        roles = set().union(*ROLE_CLASSES.values(), {"Sales User"})
+        for pair in itertools.combinations(sorted(roles), 2):
+            for rule, old in OLD_RULES.items():
+                with self.subTest(roles=pair, rule=rule):
+                    self.assertEqual(self.decide(rule, set(pair)), old(set(pair)))